@@ -0,0 +1,215 @@
+"""Page object benchmarks.
+
+Runs each page object operation many times against the static fixture site in benchmarks/fixture_site/, records
+p50/p95 latency and WebDriver round trips per operation and compares them with a stored baseline. Exits with 1
+when a metric regressed past its threshold.
+
+Usage:
+    python -m benchmarks.page_object_benchmarks [--iterations 20] [--threshold 0.25] [--update-baseline] [name ...]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from config.config import Config
+from config.locators import QAJobsPageLocators
+from pages.careers_page import CareersPage
+from pages.home_page import HomePage
+from pages.qa_jobs_page import QAJobsPage
+from utils.driver_manager import DriverManager
+from utils.logger_config import logger
+from utils.tracer import COMMAND_CATEGORIES, get_tracer, instrument_driver
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixture_site")
+
+# Tracer span categories that are WebDriver commands (page object method spans are not round trips)
+_COMMAND_SPAN_CATEGORIES = set(COMMAND_CATEGORIES) | {"other"}
+
+
+class FixtureSite:
+    """Serves the static fixture site from a local HTTP server. The Lever postings and their feed are served by
+    the same server"""
+    def __init__(self, directory=FIXTURE_DIR, host="127.0.0.1"):
+        handler = partial(_QuietHandler, directory=directory)
+        self._server = ThreadingHTTPServer((host, 0), handler)
+        self._server.daemon_threads = True
+        self.url = f"http://{host}:{self._server.server_port}/"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        logger.info("Fixture site served at %s", self.url)
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def apply_to_config(self):
+        """Points the page objects at the fixture site"""
+        Config.BASE_URL = self.url
+        Config.QA_JOBS_URL = self.url + "careers/quality-assurance/"
+        Config.LEVER_BASE_URL = self.url
+        Config.LEVER_POSTINGS_API_URL = self.url + "v0/postings/useinsider.json?mode=json"
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug("fixture site: " + format, *args)
+
+
+# Setups bring the browser into the state an operation starts from and return its page object; they are not timed
+def _open_home(driver):
+    home_page = HomePage(driver)
+    home_page.go_to_url(Config.BASE_URL)
+    return home_page
+
+
+def _open_careers(driver):
+    careers_page = CareersPage(driver)
+    careers_page.go_to_url(Config.BASE_URL.rstrip("/") + CareersPage.expected_careers_url_keyword)
+    return careers_page
+
+
+def _open_qa_job_list(driver):
+    qa_jobs_page = QAJobsPage(driver)
+    qa_jobs_page.go_to_url(Config.QA_JOBS_URL)
+    qa_jobs_page.click_see_all_qa_jobs()
+    return qa_jobs_page
+
+
+def _open_filtered_job_list(driver):
+    qa_jobs_page = _open_qa_job_list(driver)
+    qa_jobs_page.filter_by_location()
+    return qa_jobs_page
+
+
+def _close_extra_windows(driver):
+    for handle in driver.window_handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(driver.window_handles[0])
+
+
+# (name, setup, timed operation, cleanup or None)
+BENCHMARKS = [
+    ("HomePage.accept_cookies", _open_home, lambda page: page.accept_cookies(), None),
+    ("HomePage.navigate_to_careers", _open_home, lambda page: page.navigate_to_careers(), None),
+    ("CareersPage.verify_all_blocks", _open_careers, lambda page: page.verify_all_blocks(), None),
+    ("QAJobsPage.filter_by_location", _open_qa_job_list, lambda page: page.filter_by_location(), None),
+    ("QAJobsPage.verify_job_details", _open_filtered_job_list, lambda page: page.verify_job_details(), None),
+    ("QAJobsPage.lever_redirect", _open_filtered_job_list,
+     lambda page: page.navigate_to_lever_page_for_desired_job_first_job(
+         *QAJobsPageLocators.SENIOR_QA_ENGINEER_VIEW_ROLE), _close_extra_windows),
+]
+
+
+def percentile(values, percent):
+    """Percentile with linear interpolation between the closest ranks"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def run_benchmark(driver, name, setup, operation, cleanup, iterations, warmup=1):
+    """Times `operation` `iterations` times (after `warmup` untimed runs) and counts its WebDriver commands"""
+    tracer = get_tracer()
+    latencies, round_trips = [], []
+    for iteration in range(warmup + iterations):
+        page = setup(driver)
+        first_event = len(tracer.events)
+        start = time.perf_counter()
+        result = operation(page)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        commands = sum(1 for event in tracer.events[first_event:] if event["cat"] in _COMMAND_SPAN_CATEGORIES)
+        if cleanup:
+            cleanup(driver)
+        if result is False:
+            # A fast operation that did not do its job is not a meaningful measurement
+            raise AssertionError(f"{name} failed on the fixture site")
+        if iteration >= warmup:
+            latencies.append(elapsed_ms)
+            round_trips.append(commands)
+    return {
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "round_trips": statistics.median(round_trips),
+        "iterations": iterations,
+    }
+
+
+def compare_with_baseline(results, baseline, threshold, round_trip_threshold):
+    """Returns a list of human readable regressions: latencies or round trips above their threshold"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric, allowed in (("p50_ms", threshold), ("p95_ms", threshold), ("round_trips", round_trip_threshold)):
+            if previous[metric] > 0 and result[metric] > previous[metric] * (1 + allowed):
+                regressions.append(f"{name}: {metric} increased {previous[metric]:.1f} -> {result[metric]:.1f}")
+    return regressions
+
+
+def print_report(results):
+    print(f"{'Operation':<40} {'p50 ms':>10} {'p95 ms':>10} {'Round trips':>12}")
+    for name, result in results.items():
+        print(f"{name:<40} {result['p50_ms']:>10.1f} {result['p95_ms']:>10.1f} {result['round_trips']:>12g}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the page object operations against a local fixture site")
+    parser.add_argument("names", nargs="*", help="operations to run (default: all)")
+    parser.add_argument("--iterations", type=int, default=20, help="timed runs per operation")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="relative p50/p95 increase over the baseline that fails the run (0.25 = +25%%)")
+    parser.add_argument("--round-trip-threshold", type=float, default=0.2,
+                        help="relative round trip increase over the baseline that fails the run")
+    parser.add_argument("--baseline", default=Config.BENCHMARK_BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--headed", action="store_true", help="show the browser window")
+    args = parser.parse_args(argv)
+
+    benchmarks = [benchmark for benchmark in BENCHMARKS if not args.names or benchmark[0] in args.names]
+    site = FixtureSite().start()
+    site.apply_to_config()
+    driver_manager = DriverManager(headless=not args.headed)
+    driver = instrument_driver(driver_manager.create_driver())
+    results = {}
+    try:
+        for name, setup, operation, cleanup in benchmarks:
+            logger.info("Benchmarking %s (%s iterations)...", name, args.iterations)
+            results[name] = run_benchmark(driver, name, setup, operation, cleanup, args.iterations)
+    finally:
+        driver_manager.close_driver()
+        site.stop()
+
+    print_report(results)
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        baseline = {}
+    regressions = compare_with_baseline(results, baseline, args.threshold, args.round_trip_threshold)
+    for regression in regressions:
+        logger.warning("Benchmark regression - %s", regression)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+        logger.info("Benchmark baseline written to %s", args.baseline)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,7 @@ import os
 
 class Config:
     """Configuration class containing all application settings and constants"""
-    # Browser configuration - supports 'chrome' and 'firefox'
+    # Browser configuration - supports 'chrome', 'firefox' and 'remote' (REMOTE_BROWSER on the Selenium Grid)
     BROWSER = "firefox"
     # Run browser in headless mode (without UI) if True
     HEADLESS = False
@@ -11,10 +11,27 @@ class Config:
     # Application URLs for testing
     BASE_URL = "https://useinsider.com/"
     QA_JOBS_URL = "https://useinsider.com/careers/quality-assurance/"
+    LEVER_BASE_URL = "https://jobs.lever.co/"
+    # Lever postings feed the careers job list is built from
+    LEVER_POSTINGS_API_URL = "https://api.lever.co/v0/postings/useinsider?mode=json"
     # Timeout configurations in seconds
-    IMPLICIT_WAIT = 15  # Global implicit wait for element finding
+    # Global implicit wait for element finding. 0: page objects wait through EventWait, whose conditions look elements
+    # up once per check; an implicit wait would block each check on a missing element instead of waking on events
+    IMPLICIT_WAIT = 0
     EXPLICIT_WAIT = 30  # Explicit wait for specific conditions
+    # Page load strategy - 'normal' waits for every subresource, 'eager' for DOMContentLoaded, 'none' for nothing.
+    # With 'eager'/'none' navigation returns once the page object's readiness predicate (is_ready) holds
+    PAGE_LOAD_STRATEGY = "eager"
+    # Waits re-check their condition as soon as the browser reports a navigation, new tab or DOM mutation event
+    # over WebDriver BiDi. Without BiDi they poll, starting at WAIT_POLL_MIN and backing off to WAIT_POLL_MAX
+    BIDI_EVENTS_ENABLED = True
+    WAIT_POLL_MIN = 0.05  # Seconds
+    WAIT_POLL_MAX = 0.5  # Seconds
 
+    # Driver pool configuration - tests lease warm browsers instead of launching a new one each time
+    DRIVER_POOL_ENABLED = True
+    DRIVER_POOL_SIZE = 1  # Maximum number of browsers kept alive per process
+    DRIVER_POOL_MAX_USES = 20  # Recycle a browser after this many tests
 
     # Screenshot capture configuration
     SCREENSHOT_ENABLED = True
@@ -23,7 +40,96 @@ class Config:
 
     # Directory path for saving screenshots
     SCREENSHOT_PATH = os.path.join(BASE_DIR, "reports", "screenshots")
+    # Screenshots are written on a background thread. "jpeg"/"webp" re-encoding and downscaling need Pillow
+    SCREENSHOT_FORMAT = "png"
+    SCREENSHOT_MAX_WIDTH = None  # e.g. 1280 to downscale wider screenshots
+    SCREENSHOT_QUALITY = 80  # jpeg/webp quality
+    # A screenshot and DOM snapshot of the last steps are kept in memory and written (zipped) only when a step fails
+    FRAME_BUFFER_SIZE = 10  # Frames kept
+    FRAME_BUFFER_BYTES = 32 * 1024 * 1024  # Memory budget of the kept frames, oldest frames are dropped first
     # Directory path for saving HTML test reports
     HTML_REPORT_PATH = os.path.join(BASE_DIR, "reports", "html")
 
+    # Log file format - "text" for the human readable format, "json" for one JSON object per line (.jsonl)
+    LOG_FORMAT = os.environ.get("INSIDER_LOG_FORMAT", "text")
+    # Time every WebDriver command and page object method; a Chrome trace and a per-step summary are written
+    # next to the HTML report. Off by default, enable with INSIDER_TRACE=1
+    TRACE_ENABLED = os.environ.get("INSIDER_TRACE") == "1"
+
+    # Lean browser profile - blocks resources the assertions never look at to speed up page loads
+    LEAN_PROFILE_ENABLED = False
+    # Third-party URLs to block (fnmatch patterns): analytics, chat widgets, video embeds, web fonts
+    BLOCKED_URL_PATTERNS = [
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*hotjar.com*",
+        "*facebook.net*", "*linkedin.com/px*", "*snap.licdn.com*", "*clarity.ms*", "*hubspot.com*",
+        "*intercom.io*", "*drift.com*", "*youtube.com*", "*ytimg.com*", "*vimeo.com*", "*vimeocdn.com*",
+        "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+    ]
+    # Resource types to block: "image", "font", "media"
+    BLOCKED_RESOURCE_TYPES = ["image", "font", "media"]
+
+    # Selenium Grid used when BROWSER is 'remote'. Sessions of a process share DRIVER_POOL_SIZE keep-alive
+    # connections to it; the browser version and platform of the first session are pinned for the later ones
+    GRID_URL = os.environ.get("INSIDER_GRID_URL", "http://127.0.0.1:4444")
+    REMOTE_BROWSER = "chrome"  # 'chrome' or 'firefox'
+    REMOTE_CAPABILITIES_PATH = os.path.join(BASE_DIR, "reports", "remote_capabilities.json")
+
+    # Number of worker processes run_tests.py splits the suite across (1 = run tests one after another)
+    PARALLEL_WORKERS = 1
+    # SQLite history of every test's and step's duration and outcome - orders the suite (likely failing and fast
+    # tests first), quarantines flaky tests and balances parallel shards
+    TEST_HISTORY_PATH = os.path.join(BASE_DIR, "reports", "test_history.sqlite3")
+    HISTORY_WINDOW = 20  # Number of recent runs per test the statistics are computed from
+    FLAKY_MIN_RUNS = 5  # Runs a test needs in the window before it can be quarantined
+    FLAKY_FLIP_RATE = 0.3  # Share of consecutive runs with a different outcome that marks a test as flaky
+
+    # Match counts and costs of every locator from the last accepted locator profiling run
+    LOCATOR_BASELINE_PATH = os.path.join(BASE_DIR, "reports", "locator_baseline.json")
+    # p50/p95 latency and round trips of every page object operation from the last accepted benchmark run
+    BENCHMARK_BASELINE_PATH = os.path.join(BASE_DIR, "reports", "benchmark_baseline.json")
+
+    # Network mode: "off" uses the live sites, "record" captures the pages and XHR/JSON responses the flow touches,
+    # "replay" serves them from a local HTTP server so the suite runs offline
+    NETWORK_MODE = os.environ.get("INSIDER_NETWORK_MODE", "off")
+    # Directory the recorded responses are stored in
+    REPLAY_ARCHIVE_PATH = os.path.join(BASE_DIR, "replay_archive")
+
+    # Long lists are read in chunks while scrolling: rows per round trip, and how often to wait STREAM_SETTLE_MS for
+    # more rows once the end of the page is reached (lazy loading) before the list is considered complete
+    STREAM_CHUNK_SIZE = 25
+    STREAM_IDLE_ROUNDS = 2
+    STREAM_SETTLE_MS = 500
+
+    # Cross-check the rendered job list with the Lever postings feed over HTTP. Off by default, enable with
+    # INSIDER_FEED_CHECK=1
+    POSTINGS_FEED_CHECK_ENABLED = os.environ.get("INSIDER_FEED_CHECK") == "1"
+
+    # Bulk check of every 'View Role' link over HTTP: parallel requests and how many links are also opened in the browser
+    LINK_CHECK_CONCURRENCY = 8
+    LINK_CHECK_BROWSER_SAMPLE = 2
+
+    # Job matrix - every department/location combination is verified, several at a time in tabs of one browser
+    JOB_MATRIX_DEPARTMENTS = ["Quality Assurance", "Software Development", "Sales"]
+    JOB_MATRIX_LOCATIONS = ["Istanbul, Turkiye", "Amsterdam, Netherlands", "London, United Kingdom"]
+    JOB_MATRIX_TABS = 4  # Combinations loaded and filtered at the same time
+
+    # Checkpoints of the browser and page object state saved after each step of a test. Off by default, enable with
+    # INSIDER_CHECKPOINTS=1 (needed by the run that a later INSIDER_RESUME_FROM_STEP rerun resumes from)
+    CHECKPOINTS_ENABLED = os.environ.get("INSIDER_CHECKPOINTS") == "1"
+    CHECKPOINT_DIR = os.path.join(BASE_DIR, "reports", "checkpoints")
+    # Rerun a test from this step (1-based), restoring the checkpoint saved after the step before it
+    RESUME_FROM_STEP = int(os.environ.get("INSIDER_RESUME_FROM_STEP", "1"))
+
+    # Manifest remembering the resolved driver binary and browser version per browser
+    DRIVER_MANIFEST_PATH = os.path.join(BASE_DIR, ".drivers", "manifest.json")
+    # Drivers placed here (optionally under a browser major version folder, e.g. drivers/128/) are used offline
+    LOCAL_DRIVER_DIR = os.path.join(BASE_DIR, "drivers")
+
+    # Browser profiles - a tuned template (first-run pages, telemetry and updates off) is built once per browser and
+    # every session starts from a hardlinked/copy-on-write copy of it
+    PROFILE_TEMPLATES_ENABLED = True
+    PROFILE_TEMPLATE_DIR = os.path.join(BASE_DIR, ".profiles")
+    # Persistent HTTP disk cache kept between sessions and runs, so static assets are read from disk after the first run
+    BROWSER_CACHE_DIR = os.path.join(BASE_DIR, ".browser_cache")
+
 
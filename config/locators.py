@@ -2,6 +2,15 @@
 from selenium.webdriver.common.by import By
 
 
+def _xpath_literal(text):
+    """Quotes text for use in an XPath expression, also when it contains quotes itself"""
+    if "'" not in text:
+        return f"'{text}'"
+    if '"' not in text:
+        return f'"{text}"'
+    return "concat('" + "', \"'\", '".join(text.split("'")) + "')"
+
+
 class HomePageLocators:
     LOGO = (By.CSS_SELECTOR, 'a[href="/"]')
     COMPANY_MENU = (By.XPATH, "//a[contains(text(),'Company')]")
@@ -18,19 +27,42 @@ class CareersPageLocators:
 class QAJobsPageLocators:
     SEE_ALL_QA_JOBS_BTN = (By.XPATH, "//a[contains(text(),'See all QA jobs')]")
     LOCATION_FILTER = (By.ID, "select2-filter-by-location-container")
-    ISTANBUL_OPTION = (By.XPATH, "//li[contains(@class, 'select2-results__option') and text()='Istanbul, Turkiye']")
     JOB_POSITION = (By.CLASS_NAME, "position-title")
     JOB_DEPARTMENT = (By.XPATH, "//span[contains(@class, 'position-department')]")
     DEPARTMENT_VALUE_FOR_JOB_FILTERING = (By.XPATH, '//span[@id="select2-filter-by-department-container"'
                                                     ' and contains(text(), "Quality Assurance")]')
 
     JOB_LOCATION = (By.XPATH, "//div[contains(@class, 'position-location')]")
-    # Explicit and maintainable locator for job positions
+    # Container the job cards are rendered into
+    JOB_LIST = (By.ID, "jobs-list")
+    # A single job card; JOB_POSITION, JOB_DEPARTMENT and JOB_LOCATION are found inside it
+    JOB_CARD = (By.CSS_SELECTOR, "#jobs-list .position-list-item")
+    # 'View Role' link inside a job card, leads to the posting on Lever
+    VIEW_ROLE_LINK = (By.CSS_SELECTOR, "a[href*='/useinsider/']")
+    # 'View Role' link of every job card
+    VIEW_ROLE_LINKS = (By.CSS_SELECTOR, "#jobs-list .position-list-item a[href*='/useinsider/']")
+    # Explicit and maintainable locator for job positions. Matched on the posting path only, so the locators also
+    # work when Lever is served from the local replay server
     SENIOR_QA_ENGINEER_VIEW_ROLE = (By.XPATH,
-                                    "//a[@href='https://jobs.lever.co/useinsider/78ddbec0-16bf-4eab-b5a6-04facb993ddc']")
+                                    "//a[contains(@href, '/useinsider/78ddbec0-16bf-4eab-b5a6-04facb993ddc')]")
 
     QA_ENGINEER_VIEW_ROLE = (By.XPATH,
-                             "//a[@href='https://jobs.lever.co/useinsider/0ba4065b-955a-4661-ad4a-f32479f63757']")
+                             "//a[contains(@href, '/useinsider/0ba4065b-955a-4661-ad4a-f32479f63757')]")
+
+    # Every option of the opened location dropdown
+    LOCATION_OPTIONS = (By.CSS_SELECTOR, "li.select2-results__option")
+
+    # Parameterised locators for filtering by any department or location
+    @staticmethod
+    def location_option(location):
+        """Option of the location dropdown with the given text, e.g. 'Istanbul, Turkiye'"""
+        return (By.XPATH, f"//li[contains(@class, 'select2-results__option') and text()={_xpath_literal(location)}]")
+
+    @staticmethod
+    def department_value(department):
+        """Department filter once it shows the given department, e.g. 'Quality Assurance'"""
+        return (By.XPATH, '//span[@id="select2-filter-by-department-container"'
+                          f' and contains(text(), {_xpath_literal(department)})]')
 
 class JobsLeverPageLocators:
     APPLY_BUTTON = (By.XPATH, "//div[@class='postings-btn-wrapper']/a[.='Apply for this job']")
@@ -1,39 +1,292 @@
+import uuid
+import weakref
+
+from selenium.common import JavascriptException, StaleElementReferenceException, TimeoutException
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as ec
 from config.config import Config
+from utils.event_waits import EventWait, get_browser_events
+from utils.lean_profile import block_in_tab
+from utils.tracer import trace_methods
+
+# Resolves once the scroll position has stayed the same for a few animation frames (smooth scrolling finished)
+_SCROLL_FINISHED_JS = """
+const done = arguments[arguments.length - 1];
+const stableFramesNeeded = arguments[0];
+let lastX = window.scrollX, lastY = window.scrollY, stableFrames = 0;
+function check() {
+    if (window.scrollX === lastX && window.scrollY === lastY) {
+        if (++stableFrames >= stableFramesNeeded) { return done(true); }
+    } else {
+        stableFrames = 0;
+        lastX = window.scrollX;
+        lastY = window.scrollY;
+    }
+    requestAnimationFrame(check);
+}
+requestAnimationFrame(check);
+"""
+
+# Resolves once the observed subtree has gone `quietMs` without any mutation, or false after `timeoutMs`
+_DOM_SETTLED_JS = """
+const target = arguments[0] || document.body;
+const quietMs = arguments[1];
+const timeoutMs = arguments[2];
+const done = arguments[arguments.length - 1];
+let quietTimer = null;
+const finish = (settled) => {
+    observer.disconnect();
+    clearTimeout(quietTimer);
+    clearTimeout(timeoutTimer);
+    done(settled);
+};
+const observer = new MutationObserver(() => {
+    clearTimeout(quietTimer);
+    quietTimer = setTimeout(() => finish(true), quietMs);
+});
+observer.observe(target, {childList: true, subtree: true, attributes: true, characterData: true});
+quietTimer = setTimeout(() => finish(true), quietMs);
+const timeoutTimer = setTimeout(() => finish(false), timeoutMs);
+"""
+
+# Resolves a (By, value) locator to all matching elements under `root` inside the page
+_FIND_ALL_JS = """
+function findAll(by, value, root) {
+    switch (by) {
+        case 'xpath': {
+            const expression = root !== document && value.startsWith('/') ? '.' + value : value;
+            const snapshot = document.evaluate(expression, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            const nodes = [];
+            for (let i = 0; i < snapshot.snapshotLength; i++) { nodes.push(snapshot.snapshotItem(i)); }
+            return nodes;
+        }
+        case 'css selector': return Array.from(root.querySelectorAll(value));
+        case 'class name': return Array.from(root.getElementsByClassName(value));
+        case 'id': return Array.from(root.querySelectorAll('#' + CSS.escape(value)));
+        case 'name': return Array.from(root.querySelectorAll('[name="' + CSS.escape(value) + '"]'));
+        case 'tag name': return Array.from(root.getElementsByTagName(value));
+        default: throw new Error('Unsupported locator strategy: ' + by);
+    }
+}
+"""
+
+# Reads the text (or the given DOM property) of each field locator inside a row. Field locators are resolved
+# relative to their row; absolute XPaths ('//...') are made relative ('.//...').
+_READ_ROW_JS = _FIND_ALL_JS + """
+function visibleText(element) {
+    // Same as WebElement.text: elements that are not rendered have no visible text
+    return element.getClientRects().length ? element.innerText.trim() : '';
+}
+function readRow(row, fieldLocators) {
+    const values = {};
+    for (const [name, by, value, property] of fieldLocators) {
+        const match = findAll(by, value, row)[0];
+        values[name] = !match ? null : property ? match[property] : visibleText(match);
+    }
+    return values;
+}
+"""
+
+# Reads up to `limit` rows this stream (`token`) has not returned yet and marks them as returned. Then scrolls the
+# last of them into view, or one viewport further when there was none, so lazy loaded lists render the next rows
+_STREAM_ROWS_JS = _READ_ROW_JS + """
+const [rowLocator, fieldLocators, token, limit] = arguments;
+const rows = findAll(rowLocator[0], rowLocator[1], document)
+    .filter(row => row.dataset.insiderStream !== token)
+    .slice(0, limit);
+rows.forEach(row => { row.dataset.insiderStream = token; });
+if (rows.length) {
+    rows[rows.length - 1].scrollIntoView({block: 'end'});
+} else {
+    window.scrollBy(0, window.innerHeight);
+}
+return {
+    rows: rows.map(row => readRow(row, fieldLocators)),
+    atEnd: window.innerHeight + window.scrollY >= document.documentElement.scrollHeight - 1,
+};
+"""
+
+# Reads one DOM property (e.g. 'href', which is always absolute) of every element matching a locator
+_READ_PROPERTIES_JS = _FIND_ALL_JS + """
+const [locator, name] = arguments;
+return findAll(locator[0], locator[1], document).map(element => element[name]);
+"""
+
+# True when the document being loaded is not the one marked before navigating and every locator has a match.
+# A single script, so a missing element costs one round trip however many locators are checked.
+_ELEMENTS_PRESENT_JS = _FIND_ALL_JS + """
+const locators = arguments[0];
+if (window.__insiderPreviousDocument) { return false; }
+return locators.every(([by, value]) => findAll(by, value, document).length > 0);
+"""
+
+# Resolved WebElements per driver, keyed by locator. Shared by all page objects using the same driver and
+# cleared on navigation, window switches and clicks (which may navigate or re-render the page).
+_element_caches = weakref.WeakKeyDictionary()
+# Callbacks run with the driver right before a page object navigates, clicks or switches windows
+_navigation_listeners = weakref.WeakKeyDictionary()
+
+
+def add_navigation_listener(driver, callback):
+    """Registers `callback(driver)` to run before every navigation, click or window switch done through page objects"""
+    listeners = _navigation_listeners.setdefault(driver, [])
+    # Pooled drivers are reused across tests, register each callback only once
+    if callback not in listeners:
+        listeners.append(callback)
 
 
 class BasePage:
     """Base page class that provides common functionality for all page objects. The class inherited from this class
     will have all the methods below"""
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Page object methods show up as spans in the trace, around the WebDriver commands they send
+        if Config.TRACE_ENABLED:
+            trace_methods(cls)
+
     def __init__(self, driver):
         # Initialize base page with WebDriver and configuration
         self.base_url = Config.BASE_URL
         self.driver = driver
         # Set timeout for explicit waits from configuration
         self.timeout = Config.EXPLICIT_WAIT
-        # Create WebDriverWait instance for explicit waiting
-        self.wait= WebDriverWait(self.driver, self.timeout)
+        # Explicit waits re-check their condition on browser events (navigation, DOM mutations, new tabs)
+        # and poll with a growing interval otherwise, see utils/event_waits.py
+        self.wait = EventWait(self.driver, self.timeout)
+        # Navigation should return as soon as the page is usable
+        # (a script can fail while the old document is being torn down, that just means "not ready yet")
+        self.ready_wait = EventWait(self.driver, self.timeout, ignored_exceptions=[JavascriptException])
+
+    def is_ready(self):
+        """Readiness predicate of the page. Page objects override it with the elements their checks need,
+        so navigation does not wait for subresources (trackers, images) under the eager/none load strategies"""
+        return self.elements_present()
+
+    def elements_present(self, *locators):
+        """Returns whether the new document has replaced the previous one and every locator has a match"""
+        return self.driver.execute_script(_ELEMENTS_PRESENT_JS, [list(locator) for locator in locators])
+
+    def wait_until_ready(self):
+        """Waits until the page's readiness predicate holds and returns the page object"""
+        self.ready_wait.until(lambda driver: self.is_ready())
+        return self
+
+    def get_state(self):
+        """State of the page object a checkpoint needs to bring the page back (see utils/checkpoint.py).
+        Cookies, storage and the URL are saved by the checkpoint itself"""
+        return {}
+
+    def restore_state(self, url, state):
+        """Brings the page back from a checkpoint: loads `url` and reapplies the state from get_state()"""
+        self.go_to_url(url)
+        return self
+
+    @property
+    def element_cache(self):
+        """Elements already resolved on the current page, keyed by locator"""
+        return _element_caches.setdefault(self.driver, {})
+
+    def invalidate_element_cache(self, locator=None):
+        """Forgets the cached element for `locator`, or every cached element when no locator is given"""
+        if locator is None:
+            self.element_cache.clear()
+        else:
+            self.element_cache.pop(tuple(locator), None)
+
+    def _notify_navigation(self):
+        """Lets listeners (e.g. the network recorder) see the current page before it may be left"""
+        for callback in _navigation_listeners.get(self.driver, ()):
+            callback(self.driver)
+
+    def _retry_if_stale(self, locator, action):
+        """Runs `action`; if it hit a stale cached element, drops that element and runs `action` once more"""
+        try:
+            return action()
+        except StaleElementReferenceException:
+            self.invalidate_element_cache(locator)
+            return action()
 
     def find_element(self, *locator):
-        """Finds a single element using the provided locator"""
-        # Use WebDriver to find element with given locator strategy
-        return self.driver.find_element(*locator)
+        """Finds a single element using the provided locator, reusing the element found earlier on this page"""
+        element = self.element_cache.get(locator)
+        if element is None:
+            # There is no implicit wait, wait for the element to be present instead
+            element = self.wait.until(ec.presence_of_element_located(locator))
+            self.element_cache[locator] = element
+        return element
+
+    def is_element_displayed(self, *locator):
+        """Returns whether the element is displayed"""
+        return self._retry_if_stale(locator, lambda: self.find_element(*locator).is_displayed())
 
     def click_to_element(self, *locator):
         """Waits for element to be clickable and then clicks it"""
+        self._notify_navigation()
         # Wait for element to be clickable before clicking to avoid errors
-        self.wait_element_to_be_clickable(locator).click()
+        self._retry_if_stale(locator, lambda: self.wait_element_to_be_clickable(locator).click())
+        # A click can navigate or re-render, so elements found so far may no longer be valid
+        self.invalidate_element_cache()
 
     def find_elements(self, *locator):
         """Finds multiple elements using the provided locator"""
         # Use WebDriver to find all matching elements
         return self.driver.find_elements(*locator)
 
+    @staticmethod
+    def _field_arguments(field_locators):
+        """Field locators as the row scripts take them. A locator with a third item reads that DOM property
+        (e.g. (By.TAG_NAME, 'a', 'href')) instead of the element's text"""
+        return [[name, locator[0], locator[1], locator[2] if len(locator) > 2 else None]
+                for name, locator in field_locators.items()]
+
+    def stream_rows(self, row_locator, key=None, chunk_size=None, container=None, **field_locators):
+        """Yields the text of every row as a dict, e.g. {'position': ..., 'department': ...}. Rows are read
+        `chunk_size` at a time by one execute_script call each while scrolling through the list, so rows of lazy loaded
+        or paginated lists are read as they render. A field missing from a row is None.
+
+        Rows with a `key` field value seen before (e.g. the same link rendered again) are skipped. Once the end of
+        the page is reached without new rows, the stream waits for the list's `container` (the whole body when not
+        given) to settle STREAM_IDLE_ROUNDS times before it ends. Only one chunk of rows is held at a time."""
+        chunk_size = chunk_size or Config.STREAM_CHUNK_SIZE
+        fields = self._field_arguments(field_locators)
+        # Rows are marked with the token in the page, so another stream over the same list starts over
+        token = uuid.uuid4().hex
+        seen_keys = set()
+        idle_rounds = 0
+        while idle_rounds < Config.STREAM_IDLE_ROUNDS:
+            chunk = self.driver.execute_script(_STREAM_ROWS_JS, list(row_locator), fields, token, chunk_size)
+            if chunk["rows"]:
+                idle_rounds = 0
+            elif chunk["atEnd"]:
+                idle_rounds += 1
+                # Only the list itself: carousels and widgets elsewhere on the page keep the body changing
+                self.wait_for_dom_to_settle(*(container or ()), quiet_ms=Config.STREAM_SETTLE_MS)
+            for row in chunk["rows"]:
+                row_key = row.get(key) if key else None
+                if row_key is not None:
+                    if row_key in seen_keys:
+                        continue
+                    seen_keys.add(row_key)
+                yield row
+
+    def get_properties(self, locator, name):
+        """Returns a DOM property (e.g. 'href') of every element matching `locator`, in a single round trip"""
+        return self.driver.execute_script(_READ_PROPERTIES_JS, list(locator), name)
+
     def go_to_url(self, url):
-        """Navigates to the given URL"""
+        """Navigates to the given URL and returns as soon as this page's readiness predicate holds"""
+        self.start_navigation(url)
+        self.wait_until_ready()
+
+    def start_navigation(self, url):
+        """Navigates to the given URL without waiting for readiness, e.g. to let several tabs load at the same time.
+        Call wait_until_ready() before using the page"""
         # Navigate to the specified URL using WebDriver
+        self._notify_navigation()
+        self.invalidate_element_cache()
+        if Config.PAGE_LOAD_STRATEGY == "none":
+            # get() returns before the new document exists, mark the current one so is_ready cannot see it
+            self.driver.execute_script("window.__insiderPreviousDocument = true;")
         self.driver.get(url)
 
     def get_title(self):
@@ -46,17 +299,41 @@ class BasePage:
 
     def hover_to_element(self, *locator):
         """Hovers over the specified element"""
-        # Find the element to hover over
-        element = self.find_element(*locator)
-        # Create action chain to perform hover action
-        hover = ActionChains(self.driver).move_to_element(element)
-        hover.perform()
+        # Create action chain to perform hover action on the (cached) element
+        self._retry_if_stale(locator,
+                             lambda: ActionChains(self.driver).move_to_element(self.find_element(*locator)).perform())
+
+    def _wait_for_cached(self, locator, element_condition, locator_condition):
+        """Waits for a condition on the cached element if there is one, otherwise locates the element while waiting.
+
+        Checking the cached element skips one find_element round trip per poll. Once the cached element is stale or
+        not displayed (e.g. a hidden leftover of a re-render), the locator is looked up again for the rest of the
+        wait."""
+        locator = tuple(locator)
+        cached = self.element_cache.get(locator)
+
+        def condition(driver):
+            nonlocal cached
+            if cached is not None:
+                try:
+                    result = element_condition(cached)(driver)
+                    if result or cached.is_displayed():
+                        return result
+                except StaleElementReferenceException:
+                    pass
+                cached = None
+                self.invalidate_element_cache(locator)
+            return locator_condition(locator)(driver)
+
+        element = self.wait.until(condition)
+        self.element_cache[locator] = element
+        return element
 
     def wait_element_to_be_clickable(self, locator):
-        return self.wait.until(ec.element_to_be_clickable(locator))
+        return self._wait_for_cached(locator, ec.element_to_be_clickable, ec.element_to_be_clickable)
 
     def wait_element_visibility(self, locator):
-        return self.wait.until(ec.visibility_of_element_located(locator))
+        return self._wait_for_cached(locator, ec.visibility_of, ec.visibility_of_element_located)
 
     def get_text(self, locator):
         return self.wait_element_to_be_clickable(locator).text
@@ -64,7 +341,25 @@ class BasePage:
     def switch_to_window(self, index: int = -1):
         """Switches to the window at the specified index. By default, switches to the last opened window."""
         # Switch to window using window handles array - negative index gets last window
-        self.driver.switch_to.window(self.driver.window_handles[index])
+        self.switch_to_window_handle(self.driver.window_handles[index])
+
+    def switch_to_window_handle(self, handle):
+        """Switches to the window with the given handle"""
+        self._notify_navigation()
+        self.driver.switch_to.window(handle)
+        # Elements found in the previous window do not belong to this one
+        self.invalidate_element_cache()
+        block_in_tab(self.driver, handle)
+
+    def open_new_tab(self):
+        """Opens a blank tab, switches to it and returns its window handle"""
+        self._notify_navigation()
+        self.driver.switch_to.new_window("tab")
+        self.invalidate_element_cache()
+        handle = self.driver.current_window_handle
+        # Lean browsers block third-party resources per tab, before anything is loaded in it
+        block_in_tab(self.driver, handle)
+        return handle
 
     def get_window_count(self) -> int:
         """Returns the total number of open tabs in the browser."""
@@ -78,7 +373,51 @@ class BasePage:
 
     def scroll_to_element(self, *locator):
         """Scrolls to the specified element"""
-        # Find the target element
-        element = self.find_element(*locator)
-        # Execute JavaScript to smoothly scroll element into center of view
-        self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
+        # Execute JavaScript to smoothly scroll the (cached) element into center of view
+        self._retry_if_stale(locator, lambda: self.driver.execute_script(
+            "arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", self.find_element(*locator)))
+
+    def wait_for_scroll_to_finish(self, stable_frames=3):
+        """Waits until the page stops scrolling, e.g. after a smooth scrollIntoView"""
+        # Runs in the browser and returns as soon as the scroll position is stable, in a single round trip
+        self.driver.execute_async_script(_SCROLL_FINISHED_JS, stable_frames)
+
+    def wait_for_dom_to_settle(self, *locator, quiet_ms=750):
+        """Waits until the element (or the whole body when no locator is given) stops changing.
+
+        A MutationObserver in the page resets a timer on every change, so this returns `quiet_ms` after the last
+        re-render instead of after a fixed delay. Returns False if the element was still changing at timeout."""
+        try:
+            return self._retry_if_stale(locator, lambda: self.driver.execute_async_script(
+                _DOM_SETTLED_JS, self.find_element(*locator) if locator else None, quiet_ms, self.timeout * 1000))
+        except TimeoutException:
+            # The browser's script timeout can fire before the in-page timeout does
+            return False
+
+    def wait_for_new_window(self, previous_handles):
+        """Waits until a window that is not in `previous_handles` has been opened"""
+        self.wait.until(ec.new_window_is_opened(previous_handles))
+
+    def wait_for_document_ready(self):
+        """Waits until the current document has finished loading"""
+        self.wait.until(lambda driver: driver.execute_script("return document.readyState") == "complete")
+
+    def wait_for_network_idle(self, quiet_ms=500):
+        """Waits until no request of the current window has been in flight for `quiet_ms`. Network events are only
+        subscribed to while this runs, so requests already in flight when it is called are not waited for. Needs
+        BiDi; without it the document's load state is waited for instead"""
+        events = get_browser_events(self.driver)
+        if not events.subscribed:
+            self.wait_for_document_ready()
+            return
+        with events.track_network(self.driver):
+            self.wait.until(lambda driver: events.network_idle(quiet_ms))
+
+    def wait_for_page_change(self, previous_url):
+        """Waits until the browser has navigated away from `previous_url`. Follow it with the new page object's
+        wait_until_ready() to wait for the content that page needs"""
+        self.ready_wait.until(ec.url_changes(previous_url))
+
+
+if Config.TRACE_ENABLED:
+    trace_methods(BasePage)
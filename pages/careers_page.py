@@ -1,4 +1,3 @@
-import time
 from pages.base_page import BasePage
 from pages.qa_jobs_page import QAJobsPage
 from config.locators import CareersPageLocators
@@ -18,6 +17,10 @@ class CareersPage(BasePage):
         self.locator = CareersPageLocators
         super().__init__(driver)
 
+    def is_ready(self):
+        return self.elements_present(self.locator.LOCATIONS_BLOCK, self.locator.TEAMS_BLOCK,
+                                     self.locator.LIFE_AT_INSIDER_BLOCK)
+
     def check_page_loaded(self):
         return self.expected_careers_url_keyword in self.get_current_url().lower()
 
@@ -27,7 +30,7 @@ class CareersPage(BasePage):
         logger.info("Checking locations block...")
         
         self.scroll_to_element(*self.locator.LOCATIONS_BLOCK)
-        time.sleep(1)
+        self.wait_for_scroll_to_finish()
         
         is_displayed = self.wait_element_visibility(self.locator.LOCATIONS_BLOCK)
         
@@ -49,7 +52,7 @@ class CareersPage(BasePage):
         logger.info("Checking teams block...")
         
         self.scroll_to_element(*self.locator.TEAMS_BLOCK)
-        time.sleep(1)
+        self.wait_for_scroll_to_finish()
         
         is_displayed = self.wait_element_visibility(self.locator.TEAMS_BLOCK)
         
@@ -71,7 +74,7 @@ class CareersPage(BasePage):
         logger.info("Checking Life at Insider block...")
         
         self.scroll_to_element(*self.locator.LIFE_AT_INSIDER_BLOCK)
-        time.sleep(1)
+        self.wait_for_scroll_to_finish()
 
         is_displayed = self.wait_element_visibility(self.locator.LIFE_AT_INSIDER_BLOCK)
         
@@ -98,9 +101,9 @@ class CareersPage(BasePage):
         
         # Log detailed results for each block verification
         logger.info("Verification Results:")
-        logger.info(f"   Locations: {'OK' if locations_ok else 'FAIL'}")
-        logger.info(f"   Teams: {'OK' if teams_ok else 'FAIL'}")
-        logger.info(f"   Life at Insider: {'OK' if life_ok else 'FAIL'}")
+        logger.info("   Locations: %s", "OK" if locations_ok else "FAIL")
+        logger.info("   Teams: %s", "OK" if teams_ok else "FAIL")
+        logger.info("   Life at Insider: %s", "OK" if life_ok else "FAIL")
 
         if all_ok:
             logger.info("All blocks verified successfully!")
@@ -111,7 +114,8 @@ class CareersPage(BasePage):
 
     def navigate_to_qa_jobs(self):
         """Navigates to QA jobs page and returns QAJobsPage instance"""
-        # Navigate directly to QA jobs URL from config
-        self.go_to_url(Config.QA_JOBS_URL)
+        # Navigate directly to QA jobs URL from config, waiting for the QA jobs page to be ready
+        qa_jobs_page = QAJobsPage(self.driver)
+        qa_jobs_page.go_to_url(Config.QA_JOBS_URL)
         # Return new page object for QA jobs page
-        return QAJobsPage(self.driver) 
\ No newline at end of file
+        return qa_jobs_page 
\ No newline at end of file
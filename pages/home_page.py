@@ -1,6 +1,3 @@
-import time
-
-
 from selenium.common import TimeoutException, ElementClickInterceptedException
 from pages.base_page import BasePage
 from pages.careers_page import CareersPage
@@ -16,9 +13,12 @@ class HomePage(BasePage):
         self.locator = HomePageLocators
         super().__init__(driver)
 
+    def is_ready(self):
+        return self.elements_present(self.locator.LOGO)
+
     def check_page_loaded(self):
         self.wait_element_to_be_clickable(self.locator.LOGO)
-        return self.find_element(*self.locator.LOGO).is_displayed() #checks the visibility of the logo on the home page
+        return self.is_element_displayed(*self.locator.LOGO) #checks the visibility of the logo on the home page
 
     def accept_cookies(self):
         """Accepts cookies if popup is present"""
@@ -30,25 +30,26 @@ class HomePage(BasePage):
             logger.info("Cookies accepted successfully")
             
         except TimeoutException as e:
-            logger.warning(f"Cookie popup not found: {str(e)}")
+            logger.warning("Cookie popup not found: %s", e)
 
         except ElementClickInterceptedException as e:
-            logger.error(f"Cookie button could not be clicked: {str(e)}")
+            logger.error("Cookie button could not be clicked: %s", e)
 
     def navigate_to_careers(self):
         """Navigates to careers page through Company menu hover and click"""
         # Log hovering over Company menu
         logger.info("Hovering over Company menu...")
         self.hover_to_element(*self.locator.COMPANY_MENU)
-        time.sleep(0.3) # Short delay to make interactions more visible.
-        # without this the method can still perform its actions
 
         logger.info("Waiting for Careers link...")
+        # click_to_element waits for the dropdown link to become clickable, no delay needed after hovering
+        home_url = self.get_current_url()
         self.click_to_element(*self.locator.CAREERS_LINK)
-        time.sleep(0.3) # Short delay to make interactions more visible
         
         logger.info("Clicking on Careers link...")
+        # Wait for the careers page to replace the home page before handing over to CareersPage
+        self.wait_for_page_change(home_url)
+        # Return new CareersPage object for subsequent operations once its blocks are there
+        careers_page = CareersPage(self.driver).wait_until_ready()
         logger.info("Successfully navigated to Careers page")
-        
-        # Return new CareersPage object for subsequent operations
-        return CareersPage(self.driver)
\ No newline at end of file
+        return careers_page
\ No newline at end of file
@@ -1,16 +1,22 @@
+from urllib.parse import urlsplit
+
+from config.config import Config
 from config.locators import JobsLeverPageLocators
 from pages.base_page import BasePage
 from utils.logger_config import logger
 
 
 class JobsLeverPage(BasePage):
-    expected_lever_page_url = "jobs.lever.co"
 
     def __init__(self, driver):
+        # Host of the Lever site in use ("jobs.lever.co", or the local replay server)
+        self.expected_lever_page_url = urlsplit(Config.LEVER_BASE_URL).netloc
         self.locator = JobsLeverPageLocators
         super().__init__(driver)
 
+    def is_ready(self):
+        return self.elements_present(self.locator.APPLY_BUTTON)
 
     def check_apply_button_is_present(self):
         self.wait_element_to_be_clickable(self.locator.APPLY_BUTTON)
-        return self.find_element(*self.locator.APPLY_BUTTON).is_displayed() #ok
\ No newline at end of file
+        return self.is_element_displayed(*self.locator.APPLY_BUTTON) #ok
\ No newline at end of file
@@ -1,8 +1,15 @@
-import time
+import random
+import re
+
+from selenium.common import TimeoutException
+
 from pages.base_page import BasePage
+from config.config import Config
 from config.locators import QAJobsPageLocators
 from pages.jobs_lever_page import JobsLeverPage
+from utils.link_checker import check_links
 from utils.logger_config import logger
+from utils.postings_feed import compare_with_job_rows, fetch_postings
 
 class QAJobsPage(BasePage):
     # Expected values for assertions
@@ -13,10 +20,50 @@ class QAJobsPage(BasePage):
     expected_position_location = "Istanbul, Turkiye"
 
     
-    def __init__(self, driver):
+    def __init__(self, driver, department=None):
         self.locator = QAJobsPageLocators
+        # Department the job list is opened for; the page defaults to Quality Assurance
+        self.department = department or self.expected_position_department
+        # Set once 'See all QA jobs' has opened the job list and once a location filter has been applied
+        self.job_list_opened = False
+        self.location_filter = None
+        # Cards streamed by the last verify_job_details, reused by compare_with_postings_feed
+        self.job_rows = None
         super().__init__(driver)
 
+    def is_ready(self):
+        if self.job_list_opened:
+            return self.elements_present(self.locator.LOCATION_FILTER)
+        return self.elements_present(self.locator.SEE_ALL_QA_JOBS_BTN)
+
+    def get_state(self):
+        return {"department": self.department, "job_list_opened": self.job_list_opened,
+                "location_filter": self.location_filter}
+
+    def restore_state(self, url, state):
+        """Reloads the job list and applies the location filter again, the filter lives in the page's DOM only"""
+        self.department = state.get("department", self.department)
+        self.job_list_opened = state["job_list_opened"]
+        self.go_to_url(url)
+        if state["location_filter"]:
+            self.filter_by_location(state["location_filter"])
+        return self
+
+    def job_list_url(self):
+        """Open positions of the page's department, the page 'See all QA jobs' leads to for Quality Assurance"""
+        # The job board identifies departments by their lower case name without spaces, e.g. 'qualityassurance'
+        slug = re.sub(r"[^a-z0-9]", "", self.department.lower())
+        return f"{Config.BASE_URL.rstrip('/')}/careers/open-positions/?department={slug}"
+
+    def open_job_list(self, wait=True):
+        """Opens the department's job list directly. With wait=False the page keeps loading in the background,
+        call wait_until_ready() before using it"""
+        self.job_list_opened = True
+        if wait:
+            self.go_to_url(self.job_list_url())
+        else:
+            self.start_navigation(self.job_list_url())
+
     def check_page_loaded(self):
         return self.expected_qa_page_url_keyword in self.get_current_url().lower()
 
@@ -25,16 +72,21 @@ class QAJobsPage(BasePage):
         # Scroll to the 'See all QA jobs' button for better visibility
         self.scroll_to_element(*self.locator.SEE_ALL_QA_JOBS_BTN)
         self.click_to_element(*self.locator.SEE_ALL_QA_JOBS_BTN)
+        self.job_list_opened = True
         logger.info("Clicked 'See all QA jobs' button")
 
     def wait_for_department_to_load(self):
         """Waits for department filter to load and become visible"""
         # Wait for department filter element to be visible before proceeding
-        self.wait_element_visibility(self.locator.DEPARTMENT_VALUE_FOR_JOB_FILTERING)
-        logger.info("Department filter loaded: Quality Assurance is visible.")
+        self.wait_element_visibility(self.locator.department_value(self.department))
+        logger.info("Department filter loaded: %s is visible.", self.department)
+
+    def filter_by_location(self, location=None):
+        """Applies location filter to show only the jobs in `location` (Istanbul by default).
 
-    def filter_by_location(self):
-        """Applies location filter to show only Istanbul jobs"""
+        Returns False without filtering when the dropdown does not offer `location`, i.e. the department has no
+        postings there"""
+        location = location or self.expected_position_location
         # Log that we're starting location filtering process
         logger.info("Applying location filter...")
 
@@ -48,77 +100,168 @@ class QAJobsPage(BasePage):
         # Click on location dropdown to open the options
         self.click_to_element(*self.locator.LOCATION_FILTER)
         logger.info("Location dropdown opened")
-        
-        # Click on Istanbul option from the dropdown
-        self.click_to_element(*self.locator.ISTANBUL_OPTION)
-        logger.info("Istanbul, Turkiye selected")
+
+        # The dropdown only lists locations with postings; a missing one would time out in click_to_element
+        self.wait_element_visibility(self.locator.LOCATION_OPTIONS)
+        if not self.elements_present(self.locator.location_option(location)):
+            logger.warning("No %s jobs in %s, the location filter does not offer it", self.department, location)
+            return False
+
+        # Click on the location's option from the dropdown
+        self.click_to_element(*self.locator.location_option(location))
+        self.location_filter = location
+        self.job_rows = None
+        logger.info("%s selected", location)
 
         logger.info("Location filter applied successfully")
         
         # Scroll down to make job listings visible
         self.scroll_down(400)
         logger.info("Scrolled to job listings section")
+        return True
+
+    def iter_job_rows(self, chunk_size=None):
+        """Waits for the filtered job list and yields its cards as dicts with position, department, location and
+        href while scrolling through the list. Cards are read a chunk at a time and de-duplicated by their link"""
+        # The list re-renders after the location filter is applied; wait until it has stopped changing
+        if not self.wait_for_dom_to_settle(*self.locator.JOB_LIST):
+            logger.warning("Job list was still changing when the wait timed out")
+
+        # One round trip per chunk of cards instead of one per cell
+        yield from self.stream_rows(self.locator.JOB_CARD, key="href", chunk_size=chunk_size,
+                                    container=self.locator.JOB_LIST,
+                                    position=self.locator.JOB_POSITION,
+                                    department=self.locator.JOB_DEPARTMENT,
+                                    location=self.locator.JOB_LOCATION,
+                                    href=(*self.locator.VIEW_ROLE_LINK, "href"))
+
+    def get_job_rows(self):
+        """Returns every card of the filtered job list, see iter_job_rows"""
+        return list(self.iter_job_rows())
+
+    def job_row_mismatches(self, number, job):
+        """Returns a message for every field of a job card that does not match the department and location filter"""
+        location = self.location_filter or self.expected_position_location
+        pos = job["position"]
+        dep = job["department"]
+        loc = job["location"]
+
+        if None in (pos, dep, loc):
+            return [f"[Job {number}] is missing its position, department or location"]
+
+        mismatches = []
+        # Position titles only name the department for Quality Assurance ("... Quality Assurance Engineer")
+        if self.department == self.expected_position_department and \
+                self.expected_position_title.lower() not in pos.lower():
+            mismatches.append(f"[Position {number}] '{pos}' should contain '{self.expected_position_title}'.")
+        if self.department != dep:
+            mismatches.append(f"[Department {number}] Expected: '{self.department}', Actual: '{dep}'")
+        if location != loc:
+            mismatches.append(f"[Location {number}] Expected: '{location}', Actual: '{loc}'")
+        return mismatches
+
+    def find_job_mismatches(self, jobs):
+        """Returns a message for every job card that does not match the department and location filter"""
+        return [mismatch for number, job in enumerate(jobs, start=1)
+                for mismatch in self.job_row_mismatches(number, job)]
+
+    def compare_with_postings_feed(self):
+        """Cross-checks the job list with the postings feed entries of the same department and location.
+
+        The feed is read over HTTP, so the full data check costs milliseconds; postings the job list drops show up
+        in `missing_in_ui` of the returned FeedComparison. The cards verify_job_details read are compared, the list
+        is only read again when it has not run since the last filter"""
+        postings = fetch_postings(department=self.department, location=self.location_filter)
+        rows = self.job_rows if self.job_rows is not None else self.get_job_rows()
+        comparison = compare_with_job_rows(postings, rows)
+        for posting in comparison.missing_in_ui:
+            logger.error("Posting in the feed but not in the job list: %s", posting)
+        for row in comparison.unexpected_in_ui:
+            logger.error("Job listed but not in the postings feed: %s", row)
+        logger.info("%s job listing(s) match the postings feed", comparison.matched)
+        return comparison
 
     def verify_job_details(self):
-        """Verifies job details (position, department, location) for all job listings"""
+        """Verifies job details (position, department, location) for all job listings.
+
+        Cards are validated as they are streamed from the page, so long or lazy loaded lists are checked in
+        chunks instead of being read at once. They are kept in `job_rows` for compare_with_postings_feed"""
         # Log that we're starting job details verification
         logger.info("Verifying job details...")
-        time.sleep(5)
         self.wait_element_visibility(self.locator.JOB_POSITION) #this refers to all job positions. it could be more than one
 
-        positions = self.find_elements(*self.locator.JOB_POSITION)
-        departments = self.find_elements(*self.locator.JOB_DEPARTMENT)
-        locations = self.find_elements(*self.locator.JOB_LOCATION)
+        content_ok = True
+        count = 0
+        self.job_rows = []
+        for count, job in enumerate(self.iter_job_rows(), start=1):
+            self.job_rows.append(job)
+            if None in (job["position"], job["department"], job["location"]):
+                # Log error if a job card is missing its position, department or location element
+                logger.error("Job listing %s is missing its position, department or location!", count)
+                content_ok = False
+                continue
+            for mismatch in self.job_row_mismatches(count, job):
+                # Log every position, department or location that doesn't match the filter
+                logger.error(mismatch)
+                content_ok = False
 
-        if len(positions) == 0:
+        if count == 0:
             # Log warning if no job listings are found
             logger.warning("No job listings found!")
             return False
 
-        if not (len(positions) == len(departments) == len(locations)):
-            # Log error if the number of position/department/location element numbers don't match
-            logger.error("Job listing element counts don't match!")
-            return False
-
-        content_ok = True
-        for i in range(len(positions)):
-            pos = positions[i].text.strip()
-            dep = departments[i].text.strip()
-            loc = locations[i].text.strip()
-
-            if self.expected_position_title.lower() not in pos.lower():
-                # Log error if position title doesn't contain expected text
-                logger.error(f"[Position {i + 1}] '{pos}' should contain '{self.expected_position_title}'.")
-                content_ok = False
-            if self.expected_position_department != dep:
-                # Log error if department doesn't match expected value
-                logger.error(f"[Department {i + 1}] Expected: '{self.expected_position_department}', Actual: '{dep}'")
-                content_ok = False
-            if self.expected_position_location != loc:
-                # Log error if location doesn't match expected value
-                logger.error(f"[Location {i + 1}] Expected: '{self.expected_position_location}', Actual: '{loc}'")
-                content_ok = False
-
         if content_ok:
             # Log success message with count of verified job listings
-            logger.info(f"{len(positions)} job listings verified successfully")
+            logger.info("%s job listings verified successfully", count)
         else:
             # Log warning if some job listings failed verification
             logger.warning("Some job listings could not be verified")
 
         return content_ok
 
+    def get_view_role_links(self):
+        """Returns the absolute URL of every job card's 'View Role' link"""
+        return self.get_properties(self.locator.VIEW_ROLE_LINKS, "href")
+
+    def verify_view_role_links(self, sample_size=None):
+        """Checks every 'View Role' link concurrently over HTTP (status and Apply button markup) and opens a random
+        sample of them in the browser. Returns the link checks and the sampled URLs the browser found no Apply
+        button on"""
+        links = self.get_view_role_links()
+        checks = check_links(links)
+
+        sample_size = Config.LINK_CHECK_BROWSER_SAMPLE if sample_size is None else sample_size
+        failed_in_browser = []
+        job_list_handle = self.driver.current_window_handle
+        for url in random.sample(links, min(sample_size, len(links))):
+            # Each sampled posting is opened in a tab of its own, the job list stays as it is
+            self.open_new_tab()
+            lever_page = JobsLeverPage(self.driver)
+            try:
+                lever_page.go_to_url(url)
+                apply_button_ok = lever_page.check_apply_button_is_present()
+            except TimeoutException:
+                apply_button_ok = False
+            if not apply_button_ok:
+                logger.error("Apply button not present in the browser: %s", url)
+                failed_in_browser.append(url)
+            self.driver.close()
+            self.switch_to_window_handle(job_list_handle)
+        logger.info("Opened %s of %s 'View Role' link(s) in the browser", min(sample_size, len(links)), len(links))
+        return checks, failed_in_browser
+
     def navigate_to_lever_page_for_desired_job_first_job(self, *locator):
         """Navigates to Lever job application page by clicking on 'View Role' button"""
         #I have defined a parameter so that we can provide the locator for the job position you want.
         # We can call this in the test section according to the job we want.
 
+        previous_handles = self.driver.window_handles
         self.click_to_element(*locator)
 
         # Switch to the newly opened window (Lever page opens in new tab)
+        self.wait_for_new_window(previous_handles)
         self.switch_to_window()  # This method switches to the last opened window as default
         logger.info("Switched to new Lever tab.")
-        time.sleep(3)  # Wait for page to fully load
 
-        # Create and return JobsLeverPage object for further operations
-        return JobsLeverPage(self.driver)
\ No newline at end of file
+        # Create and return JobsLeverPage object for further operations once the posting is rendered
+        return JobsLeverPage(self.driver).wait_until_ready()
\ No newline at end of file
@@ -1,10 +1,22 @@
+import argparse
+import functools
 import unittest
-from HtmlTestRunner import HTMLTestRunner
 import os
 
 from config.config import Config
+from utils.parallel_runner import iter_tests, prioritize, record_result, run_parallel
+from utils.report_writer import ReportWriter, ReportingTestResult, set_block_sink
+from utils.test_history import get_test_history
+from utils.tracer import get_tracer
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Runs the Insider test suite")
+    parser.add_argument("--workers", type=int, default=Config.PARALLEL_WORKERS,
+                        help="number of parallel worker processes (1 runs the tests one after another)")
+    parser.add_argument("--run-quarantined", action="store_true",
+                        help="count the tests the history marks as flaky in the result instead of reporting them as skipped")
+    args = parser.parse_args()
+
     # Create a reports folder if one does not already exist.
     report_dir = Config.HTML_REPORT_PATH
     os.makedirs(report_dir, exist_ok=True)
@@ -13,11 +25,25 @@ if __name__ == '__main__':
     loader = unittest.TestLoader()
     suite = loader.discover(start_dir="tests", pattern="test_*.py")
 
-    # Start the HTML reporter
-    runner = HTMLTestRunner(
-        output=report_dir,
-        report_name="InsiderTestReport",       # Raporun dosya adı
-        combine_reports=True,                  # Tek sayfa rapor
-        add_timestamp=True                     # Zaman damgası eklensin mi
-    )
-    runner.run(suite)
+    # JUnit XML and HTML report, written as every test and soft assert block finishes
+    report = ReportWriter(report_dir, "InsiderTestReport")
+
+    # Workers started below record their results under this run as well
+    get_test_history().start_run()
+    test_count = len(list(iter_tests(suite)))
+    try:
+        if args.workers > 1 and test_count > 1:
+            # Shards are balanced by the durations recorded in previous runs
+            run_parallel(report, suite, min(args.workers, test_count), args.run_quarantined)
+        else:
+            set_block_sink(report.add_block)
+            runner = unittest.TextTestRunner(verbosity=2, resultclass=functools.partial(
+                ReportingTestResult, on_record=functools.partial(record_result, report)))
+            # Likely failing and fast tests first, flaky tests quarantined
+            runner.run(prioritize(suite, args.run_quarantined))
+    finally:
+        report.close()
+
+    if Config.TRACE_ENABLED:
+        # Chrome trace and per-step summary next to the HTML report
+        get_tracer().export(report_dir)
@@ -3,7 +3,13 @@ import time
 import softest
 from utils.driver_manager import DriverManager
 from utils.screenshot_manager import ScreenshotManager
+from utils.checkpoint import CheckpointStore
 from utils.logger_config import logger
+from utils.replay_server import start_network_mode
+from utils.report_writer import report_block
+from utils.test_history import ERROR, FAIL, PASS, get_test_history
+from utils.tracer import get_tracer
+from config.config import Config
 
 
 class BaseTest(softest.TestCase, unittest.TestCase):
@@ -18,20 +24,32 @@ class BaseTest(softest.TestCase, unittest.TestCase):
 
         # Record test start time for duration calculation
         self.start_time = time.time()
+        # Soft assert blocks are timed from the end of the previous one; screenshots are linked in the report
+        self.block_start = time.perf_counter()
+        self.report_screenshots = []
+        # Tag the WebDriver command and page method timings with this test
+        get_tracer().start_test(self.id())
+        get_tracer().start_step("Setup")
 
         # Initialize WebDriver
         logger.info("Starting WebDriver...")
-        self.driver_manager = DriverManager()
+        self.driver_manager = DriverManager(pooled=Config.DRIVER_POOL_ENABLED)
         self.driver = self.driver_manager.create_driver()
-
-        # Initialize screenshot manager for capturing test evidence
-        ScreenshotManager(self.driver)
+        # Keeps the last steps' screenshots and DOM snapshots in memory until a step fails
+        self.screenshot_manager = ScreenshotManager(self.driver)
+        # Record the responses the flow touches, or point the suite at the local replay server
+        self.network_recorder = start_network_mode(self.driver)
 
         logger.info("WebDriver started successfully!")
 
     def tearDown(self):
         """Runs after each test method completes"""
+        get_tracer().start_step("Teardown")
         # Close WebDriver and clean up resources
+        if getattr(self, 'network_recorder', None):
+            # Pages still open at the end of the test were not left through a page object
+            self.network_recorder.capture(self.driver)
+
         logger.info("Closing WebDriver...")
         if hasattr(self, 'driver_manager') and self.driver_manager:
             self.driver_manager.close_driver()
@@ -41,11 +59,79 @@ class BaseTest(softest.TestCase, unittest.TestCase):
         if hasattr(self, 'start_time'):
             end_time = time.time()
             duration = end_time - self.start_time
-            logger.info(f"TEST AUTOMATION COMPLETED - Duration: {duration:.2f} seconds")
+            logger.info("TEST AUTOMATION COMPLETED - Duration: %.2f seconds", duration)
+        get_tracer().end_test()
+
+    def assert_all(self, method_name=None):
+        """Fails the test if any soft assert since the last call failed, and reports the block in the test report
+        right away"""
+        outcome, detail = PASS, ""
+        try:
+            super().assert_all(method_name)
+        except AssertionError as e:
+            outcome, detail = FAIL, str(e)
+            raise
+        finally:
+            report_block(self.id(), method_name or "assert_all", outcome, time.perf_counter() - self.block_start,
+                         detail)
+            self.block_start = time.perf_counter()
+
+    def start_step(self, name):
+        """Logs the start of a test step and tags the following timings with it"""
+        logger.info(name)
+        get_tracer().start_step(name)
+
+    def run_steps(self, steps):
+        """Runs a flow given as (name, screenshot name, step) tuples. Each step gets the page object returned by the
+        step before it and returns the one the next step continues on.
+
+        The browser and page object state is checkpointed after every step but the last. With
+        INSIDER_RESUME_FROM_STEP=N the checkpoint saved after step N-1 is restored and the flow starts at step N."""
+        checkpoints = CheckpointStore()
+        first_step = 1
+        page = None
+        if Config.RESUME_FROM_STEP > 1:
+            checkpoint = checkpoints.load(self.id(), Config.RESUME_FROM_STEP - 1)
+            if checkpoint is None:
+                logger.warning("No checkpoint after step %s, running the whole flow", Config.RESUME_FROM_STEP - 1)
+            else:
+                self.start_step(f"Restore checkpoint after step {checkpoint['step']}")
+                page = checkpoints.restore(self.driver, checkpoint)
+                first_step = Config.RESUME_FROM_STEP
+                logger.info("Resumed from the checkpoint saved at %s", checkpoint["saved_at"])
+
+        for number, (name, screenshot_name, step) in enumerate(steps, start=1):
+            if number < first_step:
+                continue
+            # Step durations and outcomes go to the test history next to the test's own
+            outcome = ERROR
+            step_start = time.perf_counter()
+            try:
+                self.start_step(name)
+                page = step(page)
+                outcome = PASS
+            except AssertionError as e:
+                outcome = FAIL
+                self.take_screenshot_on_failure(screenshot_name)
+                logger.error("Step %s failed: %s", number, e)
+                raise
+            except Exception:
+                # A step that errors (timeout, missing element) gets the same context as a failed assert
+                self.take_screenshot_on_failure(screenshot_name)
+                raise
+            finally:
+                get_test_history().record_step(self.id(), name, outcome, time.perf_counter() - step_start)
+            if number < len(steps):
+                # Kept in memory only; written if a later step fails
+                self.screenshot_manager.record_frame(screenshot_name)
+                if Config.CHECKPOINTS_ENABLED:
+                    checkpoints.save(self.driver, self.id(), number, page)
 
     def take_screenshot_on_failure(self, test_name):
-        """Takes screenshot when test fails for debugging purposes"""
+        """Takes screenshot when test fails for debugging purposes, together with the screenshots and DOM snapshots
+        of the steps before it"""
         if hasattr(self, 'driver') and self.driver:
-            # Capture screenshot with failure indication in filename
-            ScreenshotManager(self.driver).take_screenshot(f"{test_name}_failed")
-            logger.info(f"Failure screenshot captured: {test_name}_failed")
\ No newline at end of file
+            # Failure screenshot plus a zip of the buffered step frames; the files are written in the background
+            manager = getattr(self, 'screenshot_manager', None) or ScreenshotManager(self.driver)
+            self.report_screenshots.extend(manager.capture_failure(test_name))
+            logger.info("Failure screenshot captured: %s_failed", test_name)
@@ -11,112 +11,138 @@ from config.locators import QAJobsPageLocators
 from tests.base_test import BaseTest
 from pages.home_page import HomePage
 from config.config import Config
+from utils.job_matrix import format_matrix, verify_job_matrix
 from utils.logger_config import logger
 
 
 class TestInsider(BaseTest):
     def test_end_to_end_insider_flow(self):
         """End-to-End Test: Complete Insider job application flow from homepage to Lever page"""
+        # Each step continues on the page object returned by the step before it. A failing step can be rerun
+        # from its checkpoint with INSIDER_RESUME_FROM_STEP=<step number>
+        self.run_steps([
+            ("Step 1: Home page verification", "step1_homepage", self.verify_home_page),
+            ("Step 2: Careers page verification", "step2_careers", self.verify_careers_page),
+            ("Step 3: QA jobs filtering", "step3_qajobs", self.filter_qa_jobs),
+            ("Step 4: Job details verification", "step4_jobdetails", self.verify_job_details),
+            ("Step 5: View Role links validation", "step5_viewrolelinks", self.verify_view_role_links),
+            ("Step 6: Lever redirect and validation", "end_to_end", self.verify_lever_redirect),
+        ])
 
-        # Step 1: Home Page Verification
-        try:
-            logger.info("Step 1: Home page verification")
-            home_page = HomePage(self.driver)
-            home_page.go_to_url(Config.BASE_URL)
-            self.soft_assert(self.assertEqual, home_page.get_current_url(), Config.BASE_URL)
-            logger.info("Accepted cookies...")
-            home_page.accept_cookies()
-            self.soft_assert(self.assertTrue, home_page.check_page_loaded(), "Home page is not loaded properly")
-            page_title = home_page.get_title()
-            self.soft_assert(self.assertEqual, home_page.expected_home_page_title, page_title)
-            self.assert_all("Home Page Kontrolleri")
-            logger.info("Home page verification successful.")
-        except AssertionError as e:
-            self.take_screenshot_on_failure("step1_homepage")
-            logger.error(f"Step 1 failed: {str(e)}")
-            raise
+    # Step 1: Home Page Verification
+    def verify_home_page(self, _):
+        home_page = HomePage(self.driver)
+        home_page.go_to_url(Config.BASE_URL)
+        self.soft_assert(self.assertEqual, home_page.get_current_url(), Config.BASE_URL)
+        logger.info("Accepted cookies...")
+        home_page.accept_cookies()
+        self.soft_assert(self.assertTrue, home_page.check_page_loaded(), "Home page is not loaded properly")
+        page_title = home_page.get_title()
+        self.soft_assert(self.assertEqual, home_page.expected_home_page_title, page_title)
+        self.assert_all("Home Page Kontrolleri")
+        logger.info("Home page verification successful.")
+        return home_page
 
-        # Step 2: Careers Page Verification
-        try:
-            logger.info("Step 2: Careers page verification")
-            careers_page = home_page.navigate_to_careers()
-            self.soft_assert(self.assertTrue, careers_page.check_page_loaded(), "Careers page is not loaded")
-            careers_url = self.driver.current_url
-            self.soft_assert(self.assertIn, careers_page.expected_careers_url_keyword, careers_url.lower())
-            careers_title = careers_page.get_title()
-            self.soft_assert(self.assertIsNotNone, careers_title)
-            self.soft_assert(self.assertEqual, careers_page.expected_career_page_title, careers_title)
-            locations_ok = careers_page.verify_location_block()
-            teams_ok = careers_page.verify_teams_block()
-            life_ok = careers_page.verify_life_at_insider_block()
-            self.soft_assert(self.assertTrue, locations_ok)
-            self.soft_assert(self.assertTrue, teams_ok)
-            self.soft_assert(self.assertTrue, life_ok)
-            self.soft_assert(self.assertEqual, careers_page.expected_locations_text,
-                             careers_page.get_location_block_text())
-            self.soft_assert(self.assertEqual, careers_page.expected_teams_text, careers_page.get_teams_block_text())
-            self.soft_assert(self.assertEqual, careers_page.expected_life_at_insider_text,
-                             careers_page.get_life_at_insider_block_text())
-            self.assert_all("Careers Page Kontrolleri")
-            logger.info("Careers page verification successful.")
-        except AssertionError as e:
-            self.take_screenshot_on_failure("step2_careers")
-            logger.error(f"Step 2 failed: {str(e)}")
-            raise
+    # Step 2: Careers Page Verification
+    def verify_careers_page(self, home_page):
+        careers_page = home_page.navigate_to_careers()
+        self.soft_assert(self.assertTrue, careers_page.check_page_loaded(), "Careers page is not loaded")
+        careers_url = self.driver.current_url
+        self.soft_assert(self.assertIn, careers_page.expected_careers_url_keyword, careers_url.lower())
+        careers_title = careers_page.get_title()
+        self.soft_assert(self.assertIsNotNone, careers_title)
+        self.soft_assert(self.assertEqual, careers_page.expected_career_page_title, careers_title)
+        locations_ok = careers_page.verify_location_block()
+        teams_ok = careers_page.verify_teams_block()
+        life_ok = careers_page.verify_life_at_insider_block()
+        self.soft_assert(self.assertTrue, locations_ok)
+        self.soft_assert(self.assertTrue, teams_ok)
+        self.soft_assert(self.assertTrue, life_ok)
+        self.soft_assert(self.assertEqual, careers_page.expected_locations_text,
+                         careers_page.get_location_block_text())
+        self.soft_assert(self.assertEqual, careers_page.expected_teams_text, careers_page.get_teams_block_text())
+        self.soft_assert(self.assertEqual, careers_page.expected_life_at_insider_text,
+                         careers_page.get_life_at_insider_block_text())
+        self.assert_all("Careers Page Kontrolleri")
+        logger.info("Careers page verification successful.")
+        return careers_page
 
-        # Step 3: QA Jobs Filtering
-        try:
-            logger.info("Step 3: QA jobs filtering")
-            qa_jobs_page = careers_page.navigate_to_qa_jobs()
-            self.soft_assert(self.assertTrue, qa_jobs_page.check_page_loaded(), "QA jobs page is not loaded")
-            qa_url = self.driver.current_url
-            self.soft_assert(self.assertIn, qa_jobs_page.expected_qa_page_url_keyword, qa_url.lower())
-            qa_title = qa_jobs_page.get_title()
-            self.soft_assert(self.assertIsNotNone, qa_title)
-            self.soft_assert(self.assertNotEqual, qa_title, "")
-            self.soft_assert(self.assertIn, qa_jobs_page.expected_qa_page_title, qa_title)
-            qa_jobs_page.click_see_all_qa_jobs()
-            qa_jobs_page.filter_by_location()
-            self.assert_all("QA Jobs Filtering")
-            logger.info("QA jobs filtering successful.")
-        except AssertionError as e:
-            self.take_screenshot_on_failure("step3_qajobs")
-            logger.error(f"Step 3 failed: {str(e)}")
-            raise
+    # Step 3: QA Jobs Filtering
+    def filter_qa_jobs(self, careers_page):
+        qa_jobs_page = careers_page.navigate_to_qa_jobs()
+        self.soft_assert(self.assertTrue, qa_jobs_page.check_page_loaded(), "QA jobs page is not loaded")
+        qa_url = self.driver.current_url
+        self.soft_assert(self.assertIn, qa_jobs_page.expected_qa_page_url_keyword, qa_url.lower())
+        qa_title = qa_jobs_page.get_title()
+        self.soft_assert(self.assertIsNotNone, qa_title)
+        self.soft_assert(self.assertNotEqual, qa_title, "")
+        self.soft_assert(self.assertIn, qa_jobs_page.expected_qa_page_title, qa_title)
+        qa_jobs_page.click_see_all_qa_jobs()
+        qa_jobs_page.filter_by_location()
+        self.assert_all("QA Jobs Filtering")
+        logger.info("QA jobs filtering successful.")
+        return qa_jobs_page
 
-        # Step 4: Job Detail Verification
-        try:
-            logger.info("Step 4: Job details verification")
-            job_details_ok = qa_jobs_page.verify_job_details()
-            self.soft_assert(self.assertTrue, job_details_ok, "Job details could not be verified!")
-            self.assert_all("Job Details Verification")
-            logger.info("Job details verification successful.")
-        except AssertionError as e:
-            self.take_screenshot_on_failure("step4_jobdetails")
-            logger.error(f"Step 4 failed: {str(e)}")
-            raise
+    # Step 4: Job Detail Verification
+    def verify_job_details(self, qa_jobs_page):
+        job_details_ok = qa_jobs_page.verify_job_details()
+        self.soft_assert(self.assertTrue, job_details_ok, "Job details could not be verified!")
+        if Config.POSTINGS_FEED_CHECK_ENABLED:
+            # The full data check runs against the postings feed; the job list only has to render the same postings
+            comparison = qa_jobs_page.compare_with_postings_feed()
+            self.soft_assert(self.assertEqual, [], comparison.missing_in_ui, "Postings missing from the job list")
+            self.soft_assert(self.assertEqual, [], comparison.unexpected_in_ui, "Job list shows unknown postings")
+        self.assert_all("Job Details Verification")
+        logger.info("Job details verification successful.")
+        return qa_jobs_page
 
-        # Step 5: Lever Redirect and Validation
-        try:
-            logger.info("Step 5: Lever redirect and validation")
-            lever_page = qa_jobs_page.navigate_to_lever_page_for_desired_job_first_job(
-                *QAJobsPageLocators.SENIOR_QA_ENGINEER_VIEW_ROLE)
-            lever_page_url = lever_page.get_current_url()
-            self.soft_assert(self.assertIn, lever_page.expected_lever_page_url, lever_page_url)
-            lever_title = lever_page.get_title()
-            self.soft_assert(self.assertIsNotNone, lever_title)
-            self.soft_assert(self.assertNotEqual, lever_title, "")
-            self.soft_assert(self.assertGreater, len(lever_title), 0)
-            self.soft_assert(self.assertTrue, lever_page.check_apply_button_is_present(), "Apply button is not present")
-            self.assert_all("Lever Page Kontrolleri")
-            logger.info("Lever page verification successful.")
-            logger.info("END-TO-END TEST COMPLETED SUCCESSFULLY!")
+    # Step 5: View Role Links Validation
+    def verify_view_role_links(self, qa_jobs_page):
+        checks, failed_in_browser = qa_jobs_page.verify_view_role_links()
+        self.soft_assert(self.assertGreater, len(checks), 0, "No 'View Role' links found")
+        self.soft_assert(self.assertEqual, [], [check.url for check in checks if not check.ok],
+                         "'View Role' links without a working Lever page")
+        self.soft_assert(self.assertEqual, [], failed_in_browser, "Apply button missing in the browser")
+        self.assert_all("View Role Link Kontrolleri")
+        logger.info("View Role links validation successful.")
+        return qa_jobs_page
 
-        except AssertionError as e:
-            # Take screenshot on failure for debugging
-            self.take_screenshot_on_failure("end_to_end")
-            logger.error(f"Test failed: {str(e)}")
-            raise
+    # Step 6: Lever Redirect and Validation
+    def verify_lever_redirect(self, qa_jobs_page):
+        lever_page = qa_jobs_page.navigate_to_lever_page_for_desired_job_first_job(
+            *QAJobsPageLocators.SENIOR_QA_ENGINEER_VIEW_ROLE)
+        lever_page_url = lever_page.get_current_url()
+        self.soft_assert(self.assertIn, lever_page.expected_lever_page_url, lever_page_url)
+        lever_title = lever_page.get_title()
+        self.soft_assert(self.assertIsNotNone, lever_title)
+        self.soft_assert(self.assertNotEqual, lever_title, "")
+        self.soft_assert(self.assertGreater, len(lever_title), 0)
+        self.soft_assert(self.assertTrue, lever_page.check_apply_button_is_present(), "Apply button is not present")
+        self.assert_all("Lever Page Kontrolleri")
+        logger.info("Lever page verification successful.")
+        logger.info("END-TO-END TEST COMPLETED SUCCESSFULLY!")
+        return lever_page
+
+    def test_job_matrix(self):
+        """Data-driven test: the job list of every configured department and location combination only shows
+        jobs of that department and location"""
+        self.start_step("Step 1: Cookie consent")
+        # Tabs opened later share the cookies, so the cookie bar never covers the filters
+        home_page = HomePage(self.driver)
+        home_page.go_to_url(Config.BASE_URL)
+        home_page.accept_cookies()
+
+        self.start_step("Step 2: Job matrix verification")
+        results = verify_job_matrix(self.driver)
+        logger.info("Job matrix:\n%s", format_matrix(results))
+        for result in results:
+            combination = f"{result.department} / {result.location}"
+            for mismatch in result.mismatches:
+                logger.error("%s: %s", combination, mismatch)
+            self.soft_assert(self.assertIn, result.status, ("ok", "empty"),
+                             f"{combination}: {result.error or result.status}")
+        self.assert_all("Job Matrix Kontrolleri")
+        logger.info("Job matrix verification successful.")
 
 
 if __name__ == "__main__":
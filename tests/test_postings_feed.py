@@ -0,0 +1,40 @@
+import json
+import unittest
+import sys
+import os
+
+# Add the project root to the path so that Python can find the modules
+current_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from utils.postings_feed import iter_json_array
+
+FIXTURE_PATH = os.path.join(project_root, "benchmarks", "fixture_site", "v0", "postings", "useinsider.json")
+
+
+def split(text, size):
+    """`text` in chunks of `size` characters, the way a response body streams in"""
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+
+class TestIterJsonArray(unittest.TestCase):
+    """Streaming parse of the postings feed, without a browser"""
+    def test_fixture_feed_at_every_chunk_size(self):
+        with open(FIXTURE_PATH, encoding="utf-8") as file:
+            text = file.read()
+        with open(FIXTURE_PATH, encoding="utf-8") as file:
+            expected = json.load(file)
+        for size in range(1, len(text) + 1):
+            with self.subTest(chunk_size=size):
+                self.assertEqual(list(iter_json_array(split(text, size))), expected)
+
+    def test_scalars_split_inside_a_number(self):
+        text = '[4.5, -12e3 , true,null ]'
+        for size in range(1, len(text) + 1):
+            with self.subTest(chunk_size=size):
+                self.assertEqual(list(iter_json_array(split(text, size))), json.loads(text))
+
+
+if __name__ == '__main__':
+    unittest.main()
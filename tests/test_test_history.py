@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+# Add the project root to the path so that Python can find the modules
+current_dir = os.path.dirname(__file__)
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from utils import parallel_runner, test_history
+from utils.report_writer import ReportingTestResult
+from utils.test_history import FAIL, PASS, quarantine
+
+
+def make_flaky_test(outcomes):
+    """Test case instance that fails or passes according to the next item of `outcomes` on each run"""
+    class Flaky(unittest.TestCase):
+        def test_flaky(self):
+            if outcomes.pop(0) == FAIL:
+                self.fail("flipped")
+    return Flaky("test_flaky")
+
+
+class TestQuarantine(unittest.TestCase):
+    """Quarantine of flaky tests by the test history, without a browser"""
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.history = test_history.TestHistory(os.path.join(directory, "history.sqlite3"), window=10)
+        self.addCleanup(self.history._connection.close)
+        # Keep the results out of the run of the real history
+        patcher = mock.patch.dict(os.environ, {"INSIDER_HISTORY_RUN_ID": "1"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.report = mock.Mock()
+
+    def run_test(self, outcome, quarantined):
+        """Runs a test once the way run_tests.py does and returns the unittest result"""
+        test = make_flaky_test([outcome])
+        if quarantined:
+            quarantine(test)
+        stream = open(os.devnull, "w")
+        self.addCleanup(stream.close)
+        result = ReportingTestResult(stream, False, 0,
+                                     on_record=lambda record: parallel_runner.record_result(self.report, record))
+        with mock.patch.object(parallel_runner, "get_test_history", return_value=self.history):
+            test.run(result)
+        return test, result
+
+    def test_quarantined_test_runs_but_reports_as_skipped(self):
+        test, result = self.run_test(FAIL, quarantined=True)
+        self.assertEqual(len(result.skipped), 1)
+        self.assertEqual(result.failures, [])
+        self.assertEqual(test.quarantined_outcome, FAIL)
+        recorded = self.history.stats()[test.id()]
+        self.assertEqual((recorded.runs, recorded.failures), (1, 1))
+
+    def test_quarantined_test_is_released_once_stable(self):
+        for outcome in [PASS, FAIL] * 3:
+            test, _ = self.run_test(outcome, quarantined=False)
+        self.assertIn(test.id(), self.history.quarantined())
+
+        for runs in range(1, self.history.window + 1):
+            self.run_test(PASS, quarantined=True)
+            if test.id() not in self.history.quarantined():
+                break
+        else:
+            self.fail("Quarantined test was never released")
+        # Stable runs push the flipping ones out of the window; one stable run is not enough
+        self.assertGreater(runs, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
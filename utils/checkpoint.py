@@ -0,0 +1,78 @@
+import importlib
+import json
+import os
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from selenium.common import WebDriverException
+
+from config.config import Config
+from utils.logger_config import logger
+
+# Both web storages of the current page as JSON strings, in one round trip
+_READ_STORAGE_JS = """
+return [JSON.stringify(Object.assign({}, window.localStorage)),
+        JSON.stringify(Object.assign({}, window.sessionStorage))];
+"""
+
+_WRITE_STORAGE_JS = """
+const [local, session] = arguments;
+for (const [key, value] of Object.entries(local)) { window.localStorage.setItem(key, value); }
+for (const [key, value] of Object.entries(session)) { window.sessionStorage.setItem(key, value); }
+"""
+
+
+class CheckpointStore:
+    """Saves the browser and page object state after each step of a flow so a rerun can start at a later step.
+
+    A checkpoint holds the current URL, the cookies and web storage of the current site, and the page object the
+    step returned together with its `get_state()`. Cookies and storage are only readable for the site that is
+    loaded, so a checkpoint restores a single site."""
+    def __init__(self, directory=Config.CHECKPOINT_DIR):
+        self.directory = directory
+
+    def _path(self, test_id, step):
+        return os.path.join(self.directory, test_id, f"step_{step}.json")
+
+    def save(self, driver, test_id, step, page):
+        """Stores the state after `step` (1-based) of the test"""
+        local_storage, session_storage = driver.execute_script(_READ_STORAGE_JS)
+        checkpoint = {
+            "step": step,
+            "saved_at": datetime.now().isoformat(timespec="seconds"),
+            "url": driver.current_url,
+            "cookies": driver.get_cookies(),
+            "local_storage": json.loads(local_storage),
+            "session_storage": json.loads(session_storage),
+            "page": f"{type(page).__module__}.{type(page).__name__}",
+            "page_state": page.get_state(),
+        }
+        path = self._path(test_id, step)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, indent=2)
+        logger.debug("Checkpoint after step %s saved to %s", step, path)
+
+    def load(self, test_id, step):
+        """Returns the stored checkpoint, or None if there is none"""
+        try:
+            with open(self._path(test_id, step), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def restore(self, driver, checkpoint):
+        """Brings the browser back to a checkpoint and returns the page object the step had returned"""
+        parts = urlsplit(checkpoint["url"])
+        # A light document on the same site, so cookies and storage can be set before the real page loads
+        driver.get(f"{parts.scheme}://{parts.netloc}/robots.txt")
+        for cookie in checkpoint["cookies"]:
+            try:
+                driver.add_cookie(cookie)
+            except WebDriverException as e:
+                logger.debug("Cookie %s could not be restored: %s", cookie.get("name"), e)
+        driver.execute_script(_WRITE_STORAGE_JS, checkpoint["local_storage"], checkpoint["session_storage"])
+
+        module_name, class_name = checkpoint["page"].rsplit(".", 1)
+        page_class = getattr(importlib.import_module(module_name), class_name)
+        return page_class(driver).restore_state(checkpoint["url"], checkpoint["page_state"])
@@ -1,4 +1,10 @@
+import atexit
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+
 from selenium import webdriver
+from selenium.common import SessionNotCreatedException, WebDriverException
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.chrome.options import Options as ChromeOptions
 
@@ -6,13 +12,17 @@ from selenium.webdriver.firefox.service import Service as FirefoxService
 from selenium.webdriver.firefox.options import Options as FirefoxOptions
 
 
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.firefox import GeckoDriverManager
-
-
 from config.config import Config
+from utils.driver_resolver import resolve_driver_path
+from utils.lean_profile import (apply_lean_chrome_interception, apply_lean_firefox_options, block_in_tab,
+                                chrome_lean_prefs)
+from utils.logger_config import logger
+from utils.profile_templates import CHROME_TEMPLATE_ARGS, get_profile_template, remove_session_profile
+from utils.remote_grid import (forget_pinned_capabilities, get_remote_connection, load_pinned_capabilities,
+                               pin_capabilities)
+from utils.tracer import instrument_driver
 
-def _setup_common_options(options):
+def _setup_common_options(options, extra_prefs=None):
     """Common browser options configuration for Chrome"""
     # Disable sandbox for compatibility in various environments
     options.add_argument("--no-sandbox")
@@ -26,48 +36,96 @@ def _setup_common_options(options):
     options.add_argument("--disable-popup-blocking")
     # Disable browser notifications
     options.add_experimental_option("prefs", {
-        "profile.default_content_setting_values.notifications": 2
+        "profile.default_content_setting_values.notifications": 2,
+        **(extra_prefs or {})
     })
 
 class DriverManager:
-    def __init__(self, headless=Config.HEADLESS, implicit_wait=Config.IMPLICIT_WAIT):
+    def __init__(self, headless=Config.HEADLESS, implicit_wait=Config.IMPLICIT_WAIT, pooled=False,
+                 lean=Config.LEAN_PROFILE_ENABLED, profile_template=Config.PROFILE_TEMPLATES_ENABLED):
         self.headless = headless
         self.implicit_wait = implicit_wait
+        # Lean browsers block the third-party URLs and resource types configured in Config
+        self.lean = lean
+        # Sessions start from a copy of a pre-built profile and keep their HTTP cache between runs
+        self.profile_template = profile_template
+        # When pooled, drivers are leased from the shared warm pool instead of launched per test
+        self.pooled = pooled
         self.driver = None
 
 
     def create_driver(self):
         if self.driver is None:
-            browser = Config.BROWSER.lower()
-            if browser == 'chrome':
-                self.driver = self._create_chrome_driver()
-            elif browser == 'firefox':
-                self.driver = self._create_firefox_driver()
+            if self.pooled:
+                self.driver = get_driver_pool().lease()
             else:
-                # Raise error for unsupported browser types
-                raise ValueError(f"Unsupported browser: {browser}. Supported browsers: chrome, firefox")
-
-            self.driver.implicitly_wait(self.implicit_wait)
-            if not self.headless:
-                self.driver.maximize_window()
+                self.driver = self._launch_driver()
+            if Config.TRACE_ENABLED:
+                # Time every WebDriver command this driver sends
+                instrument_driver(self.driver)
 
         return self.driver
 
-    def _create_chrome_driver(self):
+    def _launch_driver(self):
+        """Starts a new browser session for the configured browser"""
+        browser = Config.BROWSER.lower()
+        if browser == 'chrome':
+            driver = self._create_chrome_driver()
+        elif browser == 'firefox':
+            driver = self._create_firefox_driver()
+        elif browser == 'remote':
+            driver = self._create_remote_driver()
+        else:
+            # Raise error for unsupported browser types
+            raise ValueError(f"Unsupported browser: {browser}. Supported browsers: chrome, firefox, remote")
+
+        driver.implicitly_wait(self.implicit_wait)
+        if not self.headless:
+            driver.maximize_window()
+        return driver
+
+    def _chrome_options(self):
         options = ChromeOptions()
-        _setup_common_options(options)
+        _setup_common_options(options, chrome_lean_prefs() if self.lean else None)
+        # 'eager'/'none' let get() return before every subresource has loaded; pages wait for their own readiness
+        options.page_load_strategy = Config.PAGE_LOAD_STRATEGY
+        # BiDi events wake the page objects' waits (see utils/event_waits.py)
+        options.enable_bidi = Config.BIDI_EVENTS_ENABLED
+        if Config.NETWORK_MODE == "record":
+            # The recorder reads the responses the browser received from the performance log
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        for argument in CHROME_TEMPLATE_ARGS:
+            options.add_argument(argument)
 
         if self.headless:
             options.add_argument("--headless=new")
         options.add_argument("--window-size=1920,1080")
+        return options
 
-        return webdriver.Chrome(
-            service=ChromeService(ChromeDriverManager().install()),
-            options=options
-        )
+    def _create_chrome_driver(self):
+        options = self._chrome_options()
+        session_profile = None
+        if self.profile_template:
+            session_profile = get_profile_template("chrome", self._initialize_chrome_profile).new_session_profile()
+            options.add_argument(f"--user-data-dir={session_profile.path}")
+            options.add_argument(f"--disk-cache-dir={session_profile.cache_dir}")
 
-    def _create_firefox_driver(self):
+        driver = self._start_browser(webdriver.Chrome, ChromeService(resolve_driver_path("chrome")), options,
+                                     session_profile)
+        if self.lean:
+            apply_lean_chrome_interception(driver)
+        return driver
+
+    def _initialize_chrome_profile(self, path):
+        """Launches Chrome once on a new profile template so its first-run setup is done before it is copied"""
+        options = self._chrome_options()
+        options.add_argument(f"--user-data-dir={path}")
+        webdriver.Chrome(service=ChromeService(resolve_driver_path("chrome")), options=options).quit()
+
+    def _firefox_options(self):
         options = FirefoxOptions()
+        options.page_load_strategy = Config.PAGE_LOAD_STRATEGY
+        options.enable_bidi = Config.BIDI_EVENTS_ENABLED
 
         # Basic Firefox configuration options
         options.add_argument("--disable-gpu")
@@ -76,21 +134,274 @@ class DriverManager:
         options.set_preference("dom.webnotifications.enabled", False)
         # Disable push notifications in Firefox
         options.set_preference("dom.push.enabled", False)
+        if self.lean:
+            apply_lean_firefox_options(options)
 
         if self.headless:
             options.add_argument("--headless")
         options.add_argument("--width=1920")
         options.add_argument("--height=1080")
+        return options
+
+    def _create_firefox_driver(self):
+        options = self._firefox_options()
+        session_profile = None
+        if self.profile_template:
+            session_profile = get_profile_template("firefox", self._initialize_firefox_profile).new_session_profile()
+            # Used in place; options.profile would zip the directory and send it to geckodriver on every launch
+            options.add_argument("-profile")
+            options.add_argument(session_profile.path)
+            options.set_preference("browser.cache.disk.parent_directory", session_profile.cache_dir)
 
-        return webdriver.Firefox(
-            service=FirefoxService(GeckoDriverManager().install()),
-            options=options
-        )
+        return self._start_browser(webdriver.Firefox, FirefoxService(resolve_driver_path("firefox")), options,
+                                   session_profile)
+
+    def _initialize_firefox_profile(self, path):
+        """Launches Firefox once on a new profile template so its first-run setup is done before it is copied"""
+        options = self._firefox_options()
+        options.add_argument("-profile")
+        options.add_argument(path)
+        webdriver.Firefox(service=FirefoxService(resolve_driver_path("firefox")), options=options).quit()
+
+    def _create_remote_driver(self):
+        """Starts a session on the Selenium Grid at Config.GRID_URL for Config.REMOTE_BROWSER.
+
+        Sessions ask for the browser version and platform the first session got, so every test of every run talks to
+        the same browser build. Profile templates live on this machine and are not used for remote sessions"""
+        browser = Config.REMOTE_BROWSER.lower()
+        if browser not in ('chrome', 'firefox'):
+            raise ValueError(f"Unsupported remote browser: {browser}. Supported browsers: chrome, firefox")
+        if self.lean:
+            # CDP interception and the blocking proxy only work for browsers running on this machine
+            logger.warning("Lean profile is not supported for remote sessions, starting a regular browser")
+            self.lean = False
+
+        pinned = load_pinned_capabilities(browser)
+        try:
+            driver = self._start_remote_browser(browser, pinned)
+        except SessionNotCreatedException:
+            if not pinned:
+                raise
+            # The Grid no longer offers the pinned build, take what it has and pin that instead
+            logger.warning("Grid has no %s matching %s, requesting any version", browser, pinned)
+            forget_pinned_capabilities(browser)
+            driver = self._start_remote_browser(browser, {})
+        pin_capabilities(browser, driver.capabilities)
+        return driver
+
+    def _start_remote_browser(self, browser, capabilities):
+        options = self._chrome_options() if browser == 'chrome' else self._firefox_options()
+        for name, value in capabilities.items():
+            options.set_capability(name, value)
+        # Every remote session sends its commands over the same pool of keep-alive connections
+        return webdriver.Remote(command_executor=get_remote_connection(), options=options)
+
+    @staticmethod
+    def _start_browser(driver_class, service, options, session_profile):
+        try:
+            driver = driver_class(service=service, options=options)
+        except Exception:
+            if session_profile:
+                session_profile.remove()
+            raise
+        if session_profile:
+            # The profile copy is deleted by close_driver/the pool once the driver has been quit
+            session_profile.attach(driver)
+        return driver
 
     def close_driver(self):
         """Closes the WebDriver and cleans up resources"""
         if self.driver:
-            # Quit the driver and close all browser windows
-            self.driver.quit()
+            if self.pooled:
+                # Hand the browser back to the pool; it is reset there and stays warm for the next test
+                get_driver_pool().release(self.driver)
+            else:
+                # Quit the driver and close all browser windows
+                self.driver.quit()
+                remove_session_profile(self.driver)
             # Set driver to None to prevent reuse
-            self.driver = None
\ No newline at end of file
+            self.driver = None
+
+
+# Pages like about:blank have no storage and throw on access
+_CLEAR_STORAGE_JS = "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}"
+
+
+class _PooledDriver:
+    """Bookkeeping for a single browser owned by the pool"""
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+
+
+class DriverPool:
+    """Keeps up to `size` warm browsers that tests lease and release instead of launching their own.
+
+    Browsers are reset on release (cookies and storage cleared, windows replaced by one blank tab) and recycled
+    after `max_uses` leases, when the reset fails or as soon as they stop responding."""
+    def __init__(self, size=Config.DRIVER_POOL_SIZE, max_uses=Config.DRIVER_POOL_MAX_USES,
+                 headless=Config.HEADLESS, implicit_wait=Config.IMPLICIT_WAIT, lean=Config.LEAN_PROFILE_ENABLED):
+        self.size = size
+        self.max_uses = max_uses
+        self.implicit_wait = implicit_wait
+        self._factory = DriverManager(headless=headless, implicit_wait=implicit_wait, lean=lean)
+        self._idle = deque()
+        self._leased = {}
+        # Number of browsers currently alive (idle + leased + being launched)
+        self._total = 0
+        self._lock = threading.Condition()
+
+    def lease(self):
+        """Returns a warm driver, launching a new one only if the pool is below its size"""
+        while True:
+            entry = None
+            with self._lock:
+                while not self._idle and self._total >= self.size:
+                    self._lock.wait()
+                if self._idle:
+                    entry = self._idle.popleft()
+                else:
+                    self._total += 1
+
+            if entry is None:
+                entry = self._launch()
+            elif not self._is_healthy(entry.driver):
+                logger.warning("Pooled browser is not responding, replacing it")
+                self._discard(entry)
+                continue
+
+            with self._lock:
+                self._leased[id(entry.driver)] = entry
+            return entry.driver
+
+    def release(self, driver):
+        """Takes a driver back, resetting it for the next test or recycling it when worn out"""
+        with self._lock:
+            entry = self._leased.pop(id(driver), None)
+        if entry is None:
+            # Not one of ours, just close it
+            driver.quit()
+            remove_session_profile(driver)
+            return
+
+        entry.uses += 1
+        if entry.uses >= self.max_uses:
+            logger.info("Recycling pooled browser after %s uses", entry.uses)
+            self._discard(entry)
+            return
+        try:
+            self._reset(entry.driver)
+        except WebDriverException as e:
+            logger.warning("Pooled browser could not be reset, recycling it: %s", e)
+            self._discard(entry)
+            return
+
+        with self._lock:
+            self._idle.append(entry)
+            self._lock.notify()
+
+    def shutdown(self):
+        """Quits every idle browser; leased browsers are quit when released"""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self.max_uses = 0  # anything released from now on is quit instead of pooled
+        for entry in idle:
+            self._discard(entry)
+
+    def _launch(self):
+        try:
+            return _PooledDriver(self._factory._launch_driver())
+        except Exception:
+            with self._lock:
+                self._total -= 1
+                self._lock.notify()
+            raise
+
+    def _discard(self, entry):
+        try:
+            entry.driver.quit()
+        except WebDriverException:
+            pass
+        remove_session_profile(entry.driver)
+        with self._lock:
+            self._total -= 1
+            self._lock.notify()
+
+    @staticmethod
+    def _is_healthy(driver):
+        """Cheap liveness probe - a dead session or crashed browser fails this single round trip"""
+        try:
+            return len(driver.window_handles) > 0
+        except WebDriverException:
+            return False
+
+    def _reset(self, driver):
+        """Brings a used browser back to a blank state.
+
+        WebDriver only deletes the cookies of the page currently loaded, so the cookies of every site are deleted
+        over CDP (Chrome) or BiDi (Firefox, remote sessions). Chrome also clears the storage of every site in the
+        windows' history; over BiDi a script clears the storage of the pages the windows still show. The windows are
+        then replaced by a new tab, which also drops their session storage and history. Raises WebDriverException for
+        sessions with neither CDP nor BiDi, the pool quits those instead"""
+        # A test may have changed the implicit wait, restore it
+        driver.implicitly_wait(self.implicit_wait)
+        cdp = hasattr(driver, "execute_cdp_cmd")
+        if not cdp and not driver.caps.get("webSocketUrl"):
+            raise WebDriverException("Session has neither CDP nor BiDi to delete the cookies of every site")
+        handles = driver.window_handles
+        origins = set()
+        for handle in handles:
+            driver.switch_to.window(handle)
+            if cdp:
+                origins.update(_history_origins(driver))
+            else:
+                driver.execute_script(_CLEAR_STORAGE_JS)
+        if cdp:
+            _clear_site_data(driver, origins)
+        else:
+            # storage.deleteCookies without a filter deletes the cookies of every site
+            driver.storage.delete_cookies()
+        driver.switch_to.new_window("tab")
+        blank = driver.current_window_handle
+        block_in_tab(driver, blank)
+        for handle in handles:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(blank)
+
+
+def _history_origins(driver):
+    """Origins of the pages in the navigation history of the current window"""
+    history = driver.execute_cdp_cmd("Page.getNavigationHistory", {})
+    origins = set()
+    for entry in history["entries"]:
+        url = urlsplit(entry["url"])
+        if url.scheme in ("http", "https"):
+            origins.add(f"{url.scheme}://{url.netloc}")
+    return origins
+
+
+def _clear_site_data(driver, origins):
+    """Deletes the cookies of every origin and the storage (local storage, IndexedDB, service workers...) of
+    `origins`. The HTTP cache is kept"""
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    for origin in origins:
+        driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+
+
+_driver_pool = None
+_driver_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """Returns the process-wide driver pool, creating it on first use"""
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is None:
+            if Config.BROWSER.lower() == 'remote':
+                # Created before the pool so its exit handler runs after the pool has quit its remote sessions
+                get_remote_connection()
+            _driver_pool = DriverPool()
+            atexit.register(_driver_pool.shutdown)
+        return _driver_pool
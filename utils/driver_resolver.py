@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+from config.config import Config
+from utils.logger_config import logger
+
+# Executable names the browsers are usually installed under, checked in order
+BROWSER_BINARIES = {
+    "chrome": ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"],
+    "firefox": ["firefox", "firefox-esr"],
+}
+
+# Well known install locations for platforms where the browser is not on PATH
+BROWSER_INSTALL_PATHS = {
+    "chrome": [
+        "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+        r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+        r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+    ],
+    "firefox": [
+        "/Applications/Firefox.app/Contents/MacOS/firefox",
+        r"C:\Program Files\Mozilla Firefox\firefox.exe",
+        r"C:\Program Files (x86)\Mozilla Firefox\firefox.exe",
+    ],
+}
+
+DRIVER_NAMES = {
+    "chrome": "chromedriver",
+    "firefox": "geckodriver",
+}
+
+
+def _install_with_webdriver_manager(browser):
+    """Downloads (or finds in the webdriver_manager cache) the driver for the given browser"""
+    # Imported lazily so that cached launches never pay for importing webdriver_manager
+    if browser == "chrome":
+        from webdriver_manager.chrome import ChromeDriverManager
+        return ChromeDriverManager().install()
+    from webdriver_manager.firefox import GeckoDriverManager
+    return GeckoDriverManager().install()
+
+
+class DriverResolver:
+    """Resolves the driver binary for a browser once and remembers it in an on-disk manifest.
+
+    Each manifest entry stores the driver path together with the browser version and a fingerprint
+    (path, size, mtime) of the browser executable. As long as the fingerprint matches, the driver path is
+    returned straight from the manifest. The driver is only resolved again when the installed browser
+    version changes, and when webdriver_manager cannot reach the network the local driver directory is used."""
+    def __init__(self, manifest_path=Config.DRIVER_MANIFEST_PATH, local_driver_dir=Config.LOCAL_DRIVER_DIR):
+        self.manifest_path = manifest_path
+        self.local_driver_dir = local_driver_dir
+        self._manifest = None
+
+    def resolve(self, browser):
+        """Returns the path of the driver binary to use for the given browser"""
+        browser = browser.lower()
+        if browser not in DRIVER_NAMES:
+            raise ValueError(f"Unsupported browser: {browser}. Supported browsers: chrome, firefox")
+
+        entry = self._load_manifest().get(browser)
+        browser_binary = self._find_browser_binary(browser)
+        fingerprint = self._fingerprint(browser_binary)
+
+        # Fast path: same browser executable as last time and the driver is still on disk
+        if entry and entry.get("fingerprint") == fingerprint and os.path.isfile(entry.get("driver_path", "")):
+            return entry["driver_path"]
+
+        browser_version = self._browser_version(browser_binary)
+        if (entry and browser_version and entry.get("browser_version") == browser_version
+                and os.path.isfile(entry.get("driver_path", ""))):
+            # The executable was touched (e.g. reinstalled) but the version is the same, keep the driver
+            driver_path = entry["driver_path"]
+        else:
+            logger.info("Resolving %s driver for browser version %s...", browser, browser_version or "unknown")
+            driver_path = self._resolve_driver(browser, browser_version)
+
+        self._store(browser, {
+            "driver_path": driver_path,
+            "browser_version": browser_version,
+            "fingerprint": fingerprint,
+        })
+        return driver_path
+
+    def _resolve_driver(self, browser, browser_version):
+        try:
+            return _install_with_webdriver_manager(browser)
+        except Exception as e:
+            # Most likely offline, fall back to a driver shipped in the local driver directory
+            logger.warning("webdriver_manager could not resolve the %s driver: %s", browser, e)
+            local_path = self._find_local_driver(browser, browser_version)
+            if local_path is None:
+                raise RuntimeError(
+                    f"No {DRIVER_NAMES[browser]} available: download failed and none found in "
+                    f"{self.local_driver_dir}") from e
+            logger.info("Using local driver binary: %s", local_path)
+            return local_path
+
+    def _find_local_driver(self, browser, browser_version):
+        """Looks for the driver in LOCAL_DRIVER_DIR/<browser major version>/ first, then LOCAL_DRIVER_DIR/"""
+        name = DRIVER_NAMES[browser] + (".exe" if sys.platform.startswith("win") else "")
+        candidates = []
+        if browser_version:
+            candidates.append(os.path.join(self.local_driver_dir, browser_version.split(".")[0], name))
+        candidates.append(os.path.join(self.local_driver_dir, name))
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                return candidate
+        return None
+
+    @staticmethod
+    def _find_browser_binary(browser):
+        for name in BROWSER_BINARIES[browser]:
+            path = shutil.which(name)
+            if path:
+                return os.path.realpath(path)
+        for path in BROWSER_INSTALL_PATHS[browser]:
+            if os.path.isfile(path):
+                return path
+        return None
+
+    @staticmethod
+    def _fingerprint(browser_binary):
+        """Cheap identity of the installed browser - a single stat call instead of launching it"""
+        if browser_binary is None:
+            return None
+        stat = os.stat(browser_binary)
+        return [browser_binary, stat.st_size, stat.st_mtime_ns]
+
+    @staticmethod
+    def _browser_version(browser_binary):
+        """Asks the browser for its version, e.g. 'Mozilla Firefox 128.0' -> '128.0'"""
+        if browser_binary is None:
+            return None
+        try:
+            output = subprocess.run([browser_binary, "--version"], capture_output=True, text=True,
+                                    timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            return None
+        match = re.search(r"\d+(\.\d+)+", output)
+        return match.group(0) if match else None
+
+    def _load_manifest(self):
+        if self._manifest is None:
+            try:
+                with open(self.manifest_path, encoding="utf-8") as f:
+                    self._manifest = json.load(f)
+            except (OSError, ValueError):
+                self._manifest = {}
+        return self._manifest
+
+    def _store(self, browser, entry):
+        manifest = self._load_manifest()
+        if manifest.get(browser) == entry:
+            return
+        manifest[browser] = entry
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        # Write to a temporary file and rename so parallel runs never read a half written manifest
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+
+_resolver = None
+
+
+def resolve_driver_path(browser):
+    """Returns the driver binary path for the browser using the shared resolver"""
+    global _resolver
+    if _resolver is None:
+        _resolver = DriverResolver()
+    return _resolver.resolve(browser)
@@ -0,0 +1,208 @@
+"""Waits that re-check their condition when the browser reports something, instead of every 500 ms.
+
+Sessions started with BiDi (webSocketUrl) send navigation, new tab and DOM mutation events over the BiDi
+socket; each event wakes the waits of that driver at once. Network events are only subscribed to while a wait
+needs them (see BrowserEvents.track_network). Browsers without BiDi are polled with a growing interval,
+so a condition that holds quickly is seen quickly and a long wait does not flood the driver with commands.
+"""
+import contextlib
+import threading
+import time
+import weakref
+
+from selenium.common import NoSuchElementException, TimeoutException, WebDriverException
+from selenium.webdriver.common.bidi.common import command_builder
+
+from config.config import Config
+from utils.logger_config import logger
+
+# Channel the DOM mutation preload script reports on (script.message events)
+_DOM_MUTATION_CHANNEL = "insider-dom-mutations"
+
+# Runs in every new top-level document before its own scripts. Mutations are reported at most once per frame
+_DOM_MUTATION_PRELOAD_JS = """
+(notify) => {
+    if (window !== window.top) { return; }
+    let pending = false;
+    new MutationObserver(() => {
+        if (pending) { return; }
+        pending = true;
+        setTimeout(() => { pending = false; notify('mutation'); }, 16);
+    }).observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+"""
+
+_NAVIGATION_STARTED = "browsingContext.navigationStarted"
+# No network events: Selenium handles every BiDi event on a thread of its own, that would be one per request
+_SUBSCRIBED_EVENTS = (
+    "browsingContext.contextCreated", "browsingContext.contextDestroyed", _NAVIGATION_STARTED,
+    "browsingContext.domContentLoaded", "browsingContext.load", "browsingContext.fragmentNavigated",
+    "browsingContext.historyUpdated", "script.message",
+)
+
+# Subscribed to by track_network only, for the current window and for as long as the wait runs
+_NETWORK_STARTED = "network.beforeRequestSent"
+_NETWORK_FINISHED = ("network.responseCompleted", "network.fetchError")
+_NETWORK_EVENTS = (_NETWORK_STARTED, *_NETWORK_FINISHED)
+
+
+class _BidiEvent:
+    """Event type for the BiDi connection's callbacks, hands the raw event parameters on"""
+    def __init__(self, event_class):
+        self.event_class = event_class
+
+    @staticmethod
+    def from_json(params):
+        return params
+
+
+class BrowserEvents:
+    """Browser events of one driver. Every event bumps a counter waits can block on, and network events (while
+    tracked) keep track of the requests in flight"""
+    def __init__(self):
+        # True once the BiDi subscriptions are in place; without them waits only poll
+        self.subscribed = False
+        self._condition = threading.Condition()
+        self._generation = 0
+        self._requests = set()
+        self._last_network_activity = time.monotonic()
+
+    @property
+    def generation(self):
+        """Changes whenever an event arrives"""
+        return self._generation
+
+    def wait_for_change(self, generation, timeout):
+        """Blocks until an event arrives after `generation` was read, or `timeout` seconds. Returns whether one did"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._generation != generation, timeout)
+
+    def network_idle(self, quiet_ms):
+        """Whether no tracked request has been in flight for `quiet_ms`"""
+        with self._condition:
+            quiet = (time.monotonic() - self._last_network_activity) * 1000 >= quiet_ms
+            return not self._requests and quiet
+
+    def on_event(self, method, params):
+        if method == "script.message" and params.get("channel") != _DOM_MUTATION_CHANNEL:
+            return
+        with self._condition:
+            if method == _NETWORK_STARTED:
+                self._requests.add(params.get("request", {}).get("request"))
+                self._last_network_activity = time.monotonic()
+            elif method in _NETWORK_FINISHED:
+                self._requests.discard(params.get("request", {}).get("request"))
+                self._last_network_activity = time.monotonic()
+            elif method == _NAVIGATION_STARTED and not params.get("parent"):
+                # Requests of the document being left never complete
+                self._requests.clear()
+            self._generation += 1
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def track_network(self, driver):
+        """Subscribes to the network events of the current window for the duration of the block. Requests that
+        started before it are not seen. Needs the BiDi subscriptions (`subscribed`)"""
+        connection = driver.browsing_context.conn
+        callbacks = []
+        for method in _NETWORK_EVENTS:
+            event = _BidiEvent(method)
+            callbacks.append((event, connection.add_callback(
+                event, lambda params, method=method: self.on_event(method, params))))
+        with self._condition:
+            self._requests.clear()
+            self._last_network_activity = time.monotonic()
+        params = {"events": list(_NETWORK_EVENTS), "contexts": [driver.current_window_handle]}
+        try:
+            subscription = connection.execute(command_builder("session.subscribe", params))
+            try:
+                yield
+            finally:
+                # Browsers that return a subscription id unsubscribe by it, older ones by the same attributes
+                subscription_id = (subscription or {}).get("subscription")
+                connection.execute(command_builder(
+                    "session.unsubscribe", {"subscriptions": [subscription_id]} if subscription_id else params))
+        finally:
+            for event, callback_id in callbacks:
+                connection.remove_callback(event, callback_id)
+
+    def subscribe(self, driver):
+        """Subscribes to the driver's BiDi events, if the session was started with BiDi"""
+        if not Config.BIDI_EVENTS_ENABLED or not driver.caps.get("webSocketUrl"):
+            return
+        try:
+            connection = driver.browsing_context.conn
+            for method in _SUBSCRIBED_EVENTS:
+                connection.add_callback(_BidiEvent(method), lambda params, method=method: self.on_event(method, params))
+            connection.execute(command_builder("session.subscribe", {"events": list(_SUBSCRIBED_EVENTS)}))
+            connection.execute(command_builder("script.addPreloadScript", {
+                "functionDeclaration": _DOM_MUTATION_PRELOAD_JS,
+                "arguments": [{"type": "channel", "value": {"channel": _DOM_MUTATION_CHANNEL}}],
+            }))
+        except WebDriverException as e:
+            logger.warning("BiDi events unavailable, waits fall back to polling: %s", e)
+            return
+        self.subscribed = True
+
+
+_browser_events = weakref.WeakKeyDictionary()
+_browser_events_lock = threading.Lock()
+
+
+def get_browser_events(driver):
+    """Returns the BrowserEvents of `driver`, subscribing to its events on first use"""
+    with _browser_events_lock:
+        events = _browser_events.get(driver)
+        if events is None:
+            events = _browser_events[driver] = BrowserEvents()
+            events.subscribe(driver)
+        return events
+
+
+class EventWait:
+    """Drop-in replacement for WebDriverWait.
+
+    The condition is checked right away, then again whenever a browser event arrives (at most every `min_poll`
+    seconds) or, when nothing happens, after an interval that doubles from `min_poll` up to `max_poll`"""
+    def __init__(self, driver, timeout, ignored_exceptions=None, min_poll=None, max_poll=None):
+        self._driver = driver
+        self._timeout = timeout
+        self._ignored_exceptions = (NoSuchElementException, *(ignored_exceptions or ()))
+        self._min_poll = min_poll or Config.WAIT_POLL_MIN
+        self._max_poll = max_poll or Config.WAIT_POLL_MAX
+        self._events = get_browser_events(driver)
+
+    def until(self, method, message=""):
+        """Returns the first truthy value of `method(driver)`, raises TimeoutException after the timeout"""
+        return self._wait(method, message, lambda value: value, lambda value: value)
+
+    def until_not(self, method, message=""):
+        """Returns once `method(driver)` is falsy (or raises one of the ignored exceptions)"""
+        return self._wait(method, message, lambda value: not value, lambda value: value, ignored_result=True)
+
+    def _wait(self, method, message, done, result, ignored_result=None):
+        screen = stacktrace = None
+        poll = self._min_poll
+        end = time.monotonic() + self._timeout
+        while True:
+            checked_at = time.monotonic()
+            generation = self._events.generation
+            try:
+                value = method(self._driver)
+                if done(value):
+                    return result(value)
+            except self._ignored_exceptions as e:
+                if ignored_result is not None:
+                    return ignored_result
+                screen = getattr(e, "screen", None)
+                stacktrace = getattr(e, "stacktrace", None)
+
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutException(message, screen, stacktrace)
+            if self._events.wait_for_change(generation, min(poll, remaining)):
+                poll = self._min_poll
+                # A burst of events (a page's requests, a re-render) is checked once, not once per event
+                time.sleep(max(0.0, min(checked_at + self._min_poll - time.monotonic(), end - time.monotonic())))
+            else:
+                poll = min(poll * 2, self._max_poll)
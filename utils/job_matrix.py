@@ -0,0 +1,117 @@
+from collections import namedtuple
+
+from selenium.common import WebDriverException
+
+from config.config import Config
+from pages.qa_jobs_page import QAJobsPage
+from utils.logger_config import logger
+
+# Outcome of one department/location combination. status is "ok", "mismatch", "empty" or "error"
+MatrixResult = namedtuple("MatrixResult", "department location status jobs mismatches error")
+
+
+class _Combination:
+    """A department/location combination while it is being verified in its own tab"""
+    def __init__(self, department, location):
+        self.department = department
+        self.location = location
+        self.handle = None
+        self.page = None
+        self.error = None
+        # Set when the location dropdown does not offer the location: no postings, nothing to collect
+        self.location_missing = False
+
+
+def verify_job_matrix(driver, departments=None, locations=None, tabs=None):
+    """Verifies the job list of every department and location combination and returns a MatrixResult for each.
+
+    Combinations are verified `tabs` at a time, each in its own tab of the same browser: all tabs start loading
+    their department's job list first, then the location filter is applied in each tab, then the rows of every tab
+    are collected. WebDriver runs one command at a time, but the pages load and re-render after filtering in all
+    tabs at once, so the waits of the combinations overlap instead of adding up."""
+    departments = departments or Config.JOB_MATRIX_DEPARTMENTS
+    locations = locations or Config.JOB_MATRIX_LOCATIONS
+    tabs = tabs or Config.JOB_MATRIX_TABS
+    combinations = [_Combination(department, location) for department in departments for location in locations]
+    # Switches back through a page object, so elements cached in the matrix tabs are not served in the original one
+    original_page = QAJobsPage(driver)
+    original_handle = driver.current_window_handle
+    results = []
+
+    for start in range(0, len(combinations), tabs):
+        batch = combinations[start:start + tabs]
+        logger.info("Verifying %s job filter combination(s) in parallel tabs...", len(batch))
+        for combination in batch:
+            _run(combination, _open_tab, driver)
+        for combination in batch:
+            _run(combination, _apply_filter)
+        for combination in batch:
+            results.append(_run(combination, _collect))
+        for combination in batch:
+            if combination.handle is not None:
+                combination.page.switch_to_window_handle(combination.handle)
+                driver.close()
+        original_page.switch_to_window_handle(original_handle)
+    return results
+
+
+def _run(combination, phase, *args):
+    """Runs one phase for a combination, unless an earlier phase already failed"""
+    if combination.error is None:
+        try:
+            return phase(combination, *args)
+        except Exception as e:
+            # Recorded for this combination only, the others are still verified
+            message = e.msg if isinstance(e, WebDriverException) else str(e)
+            combination.error = message or type(e).__name__
+            logger.error("%s / %s failed: %s", combination.department, combination.location, combination.error)
+    return MatrixResult(combination.department, combination.location, "error", [], [], combination.error)
+
+
+def _open_tab(combination, driver):
+    combination.page = QAJobsPage(driver, combination.department)
+    combination.handle = combination.page.open_new_tab()
+    # Does not wait for the job list, the tab keeps loading while the next tabs are opened
+    combination.page.open_job_list(wait=False)
+
+
+def _apply_filter(combination):
+    page = combination.page
+    page.switch_to_window_handle(combination.handle)
+    page.wait_until_ready()
+    combination.location_missing = not page.filter_by_location(combination.location)
+
+
+def _collect(combination):
+    if combination.location_missing:
+        logger.info("%s / %s: no postings, empty", combination.department, combination.location)
+        return MatrixResult(combination.department, combination.location, "empty", [], [], None)
+    page = combination.page
+    page.switch_to_window_handle(combination.handle)
+    jobs = page.get_job_rows()
+    mismatches = page.find_job_mismatches(jobs)
+    status = "mismatch" if mismatches else "ok" if jobs else "empty"
+    logger.info("%s / %s: %s job(s), %s", combination.department, combination.location, len(jobs), status)
+    return MatrixResult(combination.department, combination.location, status, jobs, mismatches, None)
+
+
+def format_matrix(results):
+    """Renders the results as a table with a row per department and a column per location"""
+    departments = list(dict.fromkeys(result.department for result in results))
+    locations = list(dict.fromkeys(result.location for result in results))
+    cells = {(result.department, result.location): _cell(result) for result in results}
+    width = max(len(text) for text in locations + list(cells.values())) + 2
+    first_width = max(len(text) for text in departments + ["Department"]) + 2
+    lines = ["Department".ljust(first_width) + "".join(location.ljust(width) for location in locations)]
+    for department in departments:
+        lines.append(department.ljust(first_width) +
+                     "".join(cells.get((department, location), "-").ljust(width) for location in locations))
+    return "\n".join(line.rstrip() for line in lines)
+
+
+def _cell(result):
+    if result.status == "ok":
+        return f"ok ({len(result.jobs)})"
+    if result.status == "mismatch":
+        return f"MISMATCH ({len(result.mismatches)})"
+    return "ERROR" if result.status == "error" else result.status
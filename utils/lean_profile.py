@@ -0,0 +1,276 @@
+"""Lean browser profile: blocks third-party resources and resource types the assertions never look at.
+
+Chrome blocks them through CDP network interception, Firefox through prefs and a local blocking proxy.
+Run this module to measure how much a lean profile saves on each page:
+    python -m utils.lean_profile [url ...]
+"""
+import argparse
+import fnmatch
+import http.client
+import select
+import socket
+import sys
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from config.config import Config
+from utils.logger_config import logger
+
+# URL patterns used for each blockable resource type (CDP blocking works on URLs only)
+RESOURCE_TYPE_PATTERNS = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.avif*", "*.ico*"],
+    "font": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*"],
+    "media": ["*.mp4*", "*.webm*", "*.mp3*", "*.ogg*", "*.m3u8*"],
+}
+
+# Firefox prefs that switch off whole resource types
+FIREFOX_RESOURCE_TYPE_PREFS = {
+    "image": {"permissions.default.image": 2},
+    "font": {"browser.display.use_document_fonts": 0, "gfx.downloadable_fonts.enabled": False},
+    "media": {"media.autoplay.default": 5, "media.autoplay.blocking_policy": 2},
+}
+
+# Chrome content settings that switch off whole resource types
+CHROME_RESOURCE_TYPE_PREFS = {
+    "image": {"profile.managed_default_content_settings.images": 2},
+}
+
+# Request count, transferred bytes and load timings of the current page, from the Navigation/Resource Timing APIs.
+# Cross-origin resources without Timing-Allow-Origin report 0 bytes, so byte totals are lower bounds.
+_PAGE_STATS_JS = """
+const navigation = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+const bytes = (entry) => entry.transferSize || entry.encodedBodySize || 0;
+return {
+    url: document.URL,
+    requests: resources.length + 1,
+    bytes: resources.reduce((total, entry) => total + bytes(entry), navigation ? bytes(navigation) : 0),
+    dom_content_loaded_ms: navigation ? navigation.domContentLoadedEventEnd : null,
+    load_ms: navigation ? navigation.loadEventEnd : null,
+};
+"""
+
+
+def blocked_url_patterns(url_patterns=None, resource_types=None):
+    """All URL patterns to block: the configured third-party patterns plus those of the blocked resource types"""
+    url_patterns = Config.BLOCKED_URL_PATTERNS if url_patterns is None else url_patterns
+    resource_types = Config.BLOCKED_RESOURCE_TYPES if resource_types is None else resource_types
+    patterns = list(url_patterns)
+    for resource_type in resource_types:
+        patterns.extend(RESOURCE_TYPE_PATTERNS.get(resource_type, []))
+    return patterns
+
+
+def is_blocked(url, patterns):
+    return any(fnmatch.fnmatch(url, pattern) for pattern in patterns)
+
+
+def get_page_stats(driver):
+    """Returns request count, bytes and load timings of the page currently loaded in the driver"""
+    return driver.execute_script(_PAGE_STATS_JS)
+
+
+class BlockingProxy:
+    """Local HTTP/HTTPS proxy that refuses requests matching the blocked URL patterns.
+
+    HTTPS traffic is tunnelled untouched (CONNECT), so it is matched on 'https://host/' only, which is what the
+    third-party host patterns need. Blocked requests are counted per host."""
+    def __init__(self, patterns, host="127.0.0.1"):
+        self.patterns = patterns
+        self.blocked = Counter()
+        self._server = ThreadingHTTPServer((host, 0), self._handler())
+        self._server.daemon_threads = True
+        self.host = host
+        self.port = self._server.server_port
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        logger.info("Blocking proxy listening on %s:%s", self.host, self.port)
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        proxy = self
+
+        class _BlockingProxyHandler(BaseHTTPRequestHandler):
+            def _block_if_needed(self, url, host):
+                if is_blocked(url, proxy.patterns):
+                    proxy.blocked[host] += 1
+                    self.send_error(403, "Blocked by lean profile")
+                    return True
+                return False
+
+            def do_CONNECT(self):
+                host, _, port = self.path.partition(":")
+                if self._block_if_needed(f"https://{host}/", host):
+                    return
+                try:
+                    upstream = socket.create_connection((host, int(port or 443)), timeout=30)
+                except OSError:
+                    self.send_error(502)
+                    return
+                self.send_response(200, "Connection established")
+                self.end_headers()
+                self._tunnel(self.connection, upstream)
+
+            @staticmethod
+            def _tunnel(client, upstream):
+                sockets = [client, upstream]
+                try:
+                    while True:
+                        readable, _, errored = select.select(sockets, [], sockets, 60)
+                        if errored or not readable:
+                            return
+                        for sock in readable:
+                            data = sock.recv(65536)
+                            if not data:
+                                return
+                            (upstream if sock is client else client).sendall(data)
+                except OSError:
+                    return
+                finally:
+                    upstream.close()
+
+            def _forward(self):
+                parts = urlsplit(self.path)
+                if self._block_if_needed(self.path, parts.hostname or ""):
+                    return
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+                headers = {k: v for k, v in self.headers.items() if k.lower() not in ("proxy-connection", "connection")}
+                connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+                try:
+                    connection.request(self.command, parts.path + (f"?{parts.query}" if parts.query else "") or "/",
+                                       body=body or None, headers=headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                except OSError:
+                    self.send_error(502)
+                    return
+                finally:
+                    connection.close()
+                self.send_response(response.status, response.reason)
+                for key, value in response.getheaders():
+                    if key.lower() not in ("transfer-encoding", "connection", "content-length"):
+                        self.send_header(key, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_HEAD = do_PUT = do_DELETE = do_OPTIONS = _forward
+
+            def log_message(self, format, *args):
+                logger.debug("blocking proxy: " + format, *args)
+
+        return _BlockingProxyHandler
+
+
+_blocking_proxy = None
+
+
+def get_blocking_proxy():
+    """Returns the process-wide blocking proxy used by lean Firefox sessions, starting it on first use"""
+    global _blocking_proxy
+    if _blocking_proxy is None:
+        _blocking_proxy = BlockingProxy(blocked_url_patterns(resource_types=[])).start()
+    return _blocking_proxy
+
+
+def apply_lean_firefox_options(options):
+    """Adds the lean prefs and the blocking proxy to Firefox options"""
+    for resource_type in Config.BLOCKED_RESOURCE_TYPES:
+        for pref, value in FIREFOX_RESOURCE_TYPE_PREFS.get(resource_type, {}).items():
+            options.set_preference(pref, value)
+    if Config.BLOCKED_URL_PATTERNS:
+        proxy = get_blocking_proxy()
+        options.set_preference("network.proxy.type", 1)
+        options.set_preference("network.proxy.http", proxy.host)
+        options.set_preference("network.proxy.http_port", proxy.port)
+        options.set_preference("network.proxy.ssl", proxy.host)
+        options.set_preference("network.proxy.ssl_port", proxy.port)
+
+
+def chrome_lean_prefs():
+    """Chrome prefs that switch off the blocked resource types"""
+    prefs = {}
+    for resource_type in Config.BLOCKED_RESOURCE_TYPES:
+        prefs.update(CHROME_RESOURCE_TYPE_PREFS.get(resource_type, {}))
+    return prefs
+
+
+def apply_lean_chrome_interception(driver):
+    """Blocks the configured URL patterns and resource types through CDP network interception.
+
+    CDP network settings only apply to the tab they are sent to, so the driver remembers the tabs it has blocked
+    them in and BasePage calls block_in_tab for every tab it opens or switches to"""
+    driver._insider_lean_tabs = set()
+    block_in_tab(driver, driver.current_window_handle)
+
+
+def block_in_tab(driver, handle):
+    """Blocks the lean profile's URLs in the tab `handle`, which must be the current one, of a lean Chrome driver.
+    Does nothing for other drivers or tabs already blocked. A tab opened by the page (target=_blank) has started its
+    first load before it can be switched to; only the pages it loads after that are blocked"""
+    tabs = getattr(driver, "_insider_lean_tabs", None)
+    if tabs is None or handle in tabs:
+        return
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_url_patterns()})
+    tabs.add(handle)
+
+
+def measure_savings(urls):
+    """Loads each URL with a normal and a lean profile and returns the per-page difference"""
+    from utils.driver_manager import DriverManager
+
+    stats = {}
+    for lean in (False, True):
+        driver_manager = DriverManager(lean=lean)
+        driver = driver_manager.create_driver()
+        try:
+            for url in urls:
+                driver.get(url)
+                stats.setdefault(url, {})["lean" if lean else "normal"] = get_page_stats(driver)
+        finally:
+            driver_manager.close_driver()
+
+    report = []
+    for url in urls:
+        normal, lean = stats[url]["normal"], stats[url]["lean"]
+        report.append({
+            "url": url,
+            "requests_saved": normal["requests"] - lean["requests"],
+            "bytes_saved": normal["bytes"] - lean["bytes"],
+            "load_ms_saved": (normal["load_ms"] or 0) - (lean["load_ms"] or 0),
+            "normal": normal,
+            "lean": lean,
+        })
+    return report
+
+
+def print_savings(report):
+    print(f"{'Page':<60} {'Requests saved':>15} {'KB saved':>10} {'Load ms saved':>14}")
+    for row in report:
+        print(f"{row['url']:<60} {row['requests_saved']:>15} {row['bytes_saved'] / 1024:>10.1f} "
+              f"{row['load_ms_saved']:>14.0f}")
+    if _blocking_proxy is not None and _blocking_proxy.blocked:
+        print("\nRequests refused by the blocking proxy:")
+        for host, count in _blocking_proxy.blocked.most_common():
+            print(f"    {host}: {count}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measures what the lean browser profile saves per page")
+    parser.add_argument("urls", nargs="*", help="pages to measure (default: home, careers and QA jobs pages)")
+    args = parser.parse_args(argv)
+    urls = args.urls or [Config.BASE_URL, Config.BASE_URL.rstrip("/") + "/careers/", Config.QA_JOBS_URL]
+    print_savings(measure_savings(urls))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
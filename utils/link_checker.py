@@ -0,0 +1,107 @@
+"""Concurrent HTTP validation of links to Lever postings.
+
+Every link is requested from a shared connection pool, at most LINK_CHECK_CONCURRENCY at a time, and passes when it
+answers with a 2xx status and its HTML contains the 'Apply for this job' button (the markup
+JobsLeverPageLocators.APPLY_BUTTON matches). The body is only parsed until the button has been seen.
+"""
+import codecs
+import functools
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+
+import urllib3
+
+from config.config import Config
+from utils.logger_config import logger
+
+# Result of one link; error is set when the request itself failed
+LinkCheck = namedtuple("LinkCheck", "url status has_apply_button ok error elapsed_ms")
+
+_APPLY_BUTTON_TEXT = "Apply for this job"
+_CHUNK_SIZE = 16 * 1024
+_USER_AGENT = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+               "Chrome/126.0 Safari/537.36")
+
+
+class _ApplyButtonParser(HTMLParser):
+    """Finds <div class="postings-btn-wrapper"><a>Apply for this job</a></div> while the body is fed in chunks.
+
+    Only <div> elements are counted to know where the wrapper ends: their end tag is required, unlike the one of
+    <p> or <li>, and void elements like <input> have none, so counting every element drifts on real pages"""
+    def __init__(self):
+        super().__init__()
+        self.found = False
+        self._div_depth = 0
+        self._wrapper_depth = None
+        self._link_text = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "div":
+            self._div_depth += 1
+            classes = (dict(attrs).get("class") or "").split()
+            if self._wrapper_depth is None and "postings-btn-wrapper" in classes:
+                self._wrapper_depth = self._div_depth
+        elif tag == "a" and self._wrapper_depth is not None:
+            self._link_text = ""
+
+    def handle_data(self, data):
+        if self._link_text is not None:
+            self._link_text += data
+
+    def handle_startendtag(self, tag, attrs):
+        pass
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._link_text is not None:
+            self.found = self.found or self._link_text.strip() == _APPLY_BUTTON_TEXT
+            self._link_text = None
+        elif tag == "div":
+            if self._wrapper_depth == self._div_depth:
+                self._wrapper_depth = None
+            self._div_depth -= 1
+
+
+def _check(pool, url):
+    start = time.perf_counter()
+    parser = _ApplyButtonParser()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    try:
+        response = pool.request("GET", url, preload_content=False)
+        try:
+            for chunk in response.stream(_CHUNK_SIZE):
+                parser.feed(decoder.decode(chunk))
+                if parser.found:
+                    break
+        finally:
+            # The rest of the body is discarded so the keep-alive connection can go back to the pool
+            response.drain_conn()
+            response.release_conn()
+    except urllib3.exceptions.HTTPError as e:
+        return LinkCheck(url, None, False, False, str(e), (time.perf_counter() - start) * 1000)
+    ok = 200 <= response.status < 300 and parser.found
+    return LinkCheck(url, response.status, parser.found, ok, None, (time.perf_counter() - start) * 1000)
+
+
+def check_links(urls, concurrency=None):
+    """Checks every URL, at most `concurrency` at a time, and returns the LinkChecks in the order of `urls`"""
+    concurrency = concurrency or Config.LINK_CHECK_CONCURRENCY
+    start = time.perf_counter()
+    # One pool of keep-alive connections per host, shared by all requests
+    pool = urllib3.PoolManager(maxsize=concurrency, block=True, headers={"User-Agent": _USER_AGENT},
+                               timeout=urllib3.Timeout(connect=10, read=Config.EXPLICIT_WAIT),
+                               retries=urllib3.Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504]))
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="link-check") as executor:
+            results = list(executor.map(functools.partial(_check, pool), urls))
+    finally:
+        pool.clear()
+    failed = [result for result in results if not result.ok]
+    logger.info("Checked %s link(s) in %.0f ms, %s failed", len(results), (time.perf_counter() - start) * 1000,
+                len(failed))
+    for result in failed:
+        logger.error("Link check failed: %s (status %s, apply button %s%s)", result.url, result.status,
+                     "present" if result.has_apply_button else "missing",
+                     f", {result.error}" if result.error else "")
+    return results
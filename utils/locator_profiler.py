@@ -0,0 +1,294 @@
+"""Locator profiling tool.
+
+Loads each page, times every locator of the *Locators classes in config/locators.py, suggests equivalent CSS
+selectors for XPath locators and compares the results with a stored baseline.
+
+Usage:
+    python -m utils.locator_profiler [--iterations 200] [--threshold 0.5] [--update-baseline]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+from selenium.webdriver.common.by import By
+
+from config import locators
+from config.config import Config
+from pages.base_page import BasePage
+from pages.careers_page import CareersPage
+from pages.home_page import HomePage
+from pages.qa_jobs_page import QAJobsPage
+from utils.driver_manager import DriverManager
+from utils.logger_config import logger
+
+# Evaluates a locator `iterations` times inside the page and returns the match count and mean cost in ms
+_TIME_LOCATOR_JS = """
+const [by, value, iterations] = arguments;
+function run() {
+    if (by === 'xpath') {
+        return document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null).snapshotLength;
+    }
+    if (by === 'id') { return document.querySelectorAll('#' + CSS.escape(value)).length; }
+    if (by === 'class name') { return document.getElementsByClassName(value).length; }
+    return document.querySelectorAll(value).length;
+}
+let count = run();
+const start = performance.now();
+for (let i = 0; i < iterations; i++) { count = run(); }
+return {count: count, in_page_ms: (performance.now() - start) / iterations};
+"""
+
+# Returns true if an XPath and a CSS selector match exactly the same elements, in the same order
+_SAME_MATCHES_JS = """
+const [xpath, css] = arguments;
+const snapshot = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+let cssMatches;
+try { cssMatches = document.querySelectorAll(css); } catch (e) { return false; }
+if (snapshot.snapshotLength === 0 || snapshot.snapshotLength !== cssMatches.length) { return false; }
+for (let i = 0; i < cssMatches.length; i++) {
+    if (snapshot.snapshotItem(i) !== cssMatches[i]) { return false; }
+}
+return true;
+"""
+
+_STEP_RE = re.compile(r"^(?P<axis>//|/)(?P<tag>[\w*-]+)(?:\[(?P<predicate>.*)\])?$")
+_ATTRIBUTE_EQUALS_RE = re.compile(r"^@(?P<name>[\w-]+)\s*=\s*(?P<quote>['\"])(?P<value>.*)(?P=quote)$")
+_CONTAINS_ATTRIBUTE_RE = re.compile(
+    r"^contains\(\s*@(?P<name>[\w-]+)\s*,\s*(?P<quote>['\"])(?P<value>.*)(?P=quote)\s*\)$")
+_TEXT_PREDICATE_RE = re.compile(r"^(contains\(\s*(text\(\)|\.)\s*,.*\)|(text\(\)|\.)\s*=.*)$")
+
+
+def _split_steps(xpath):
+    """Splits an XPath into location steps, ignoring '/' inside predicates and quotes"""
+    steps, current, depth, quote = [], "", 0, None
+    i = 0
+    while i < len(xpath):
+        char = xpath[i]
+        if quote:
+            quote = None if char == quote else quote
+        elif char in "'\"":
+            quote = char
+        elif char == "[":
+            depth += 1
+        elif char == "]":
+            depth -= 1
+        elif char == "/" and depth == 0 and current and current not in ("/", "//"):
+            steps.append(current)
+            current = ""
+        current += char
+        i += 1
+    steps.append(current)
+    return steps
+
+
+def _split_and(predicate):
+    """Splits a predicate on top-level ' and ' operators"""
+    parts, current, depth, quote = [], "", 0, None
+    i = 0
+    while i < len(predicate):
+        char = predicate[i]
+        if quote:
+            quote = None if char == quote else quote
+        elif char in "'\"":
+            quote = char
+        elif char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif depth == 0 and predicate.startswith(" and ", i):
+            parts.append(current.strip())
+            current = ""
+            i += len(" and ")
+            continue
+        current += char
+        i += 1
+    parts.append(current.strip())
+    return parts
+
+
+def css_candidates(xpath):
+    """Returns CSS selectors that may match the same elements as a simple XPath, most specific first.
+
+    Only steps made of a tag and attribute predicates are translated. Text predicates have no CSS equivalent
+    and are dropped, so every candidate must be checked against the page before it is suggested."""
+    strict, loose = [], []
+    for step in _split_steps(xpath):
+        match = _STEP_RE.match(step)
+        if not match:
+            return []
+        combinator = " " if match.group("axis") == "//" else " > "
+        tag = "" if match.group("tag") == "*" else match.group("tag")
+        strict_step, loose_step = tag, tag
+        for part in _split_and(match.group("predicate") or ""):
+            if not part or _TEXT_PREDICATE_RE.match(part):
+                continue
+            equals = _ATTRIBUTE_EQUALS_RE.match(part)
+            contains = _CONTAINS_ATTRIBUTE_RE.match(part)
+            if equals:
+                selector = f'[{equals.group("name")}="{equals.group("value")}"]'
+                strict_step += selector
+                loose_step += selector
+            elif contains and contains.group("name") == "class" and re.fullmatch(r"[\w-]+", contains.group("value")):
+                strict_step += "." + contains.group("value")
+                loose_step += f'[class*="{contains.group("value")}"]'
+            elif contains:
+                selector = f'[{contains.group("name")}*="{contains.group("value")}"]'
+                strict_step += selector
+                loose_step += selector
+            else:
+                return []
+        strict.append((combinator, strict_step or "*"))
+        loose.append((combinator, loose_step or "*"))
+
+    candidates = []
+    for steps in (strict, loose):
+        selector = "".join(combinator + step for combinator, step in steps).strip().lstrip("> ").strip()
+        if selector not in candidates:
+            candidates.append(selector)
+    return candidates
+
+
+def _open_home(driver):
+    HomePage(driver).go_to_url(Config.BASE_URL)
+
+
+def _open_careers(driver):
+    CareersPage(driver).go_to_url(Config.BASE_URL.rstrip("/") + CareersPage.expected_careers_url_keyword)
+
+
+def _open_qa_landing(driver):
+    QAJobsPage(driver).go_to_url(Config.QA_JOBS_URL)
+
+
+def _open_qa_job_list(driver):
+    """Opens the filtered job list with the location dropdown expanded so the options are in the DOM"""
+    qa_jobs_page = QAJobsPage(driver)
+    qa_jobs_page.go_to_url(Config.QA_JOBS_URL)
+    qa_jobs_page.click_see_all_qa_jobs()
+    qa_jobs_page.wait_for_department_to_load()
+    qa_jobs_page.click_to_element(*qa_jobs_page.locator.LOCATION_FILTER)
+
+
+def _open_lever(driver):
+    posting_path = locators.QAJobsPageLocators.SENIOR_QA_ENGINEER_VIEW_ROLE[1].split("'")[1]
+    driver.get(Config.LEVER_BASE_URL.rstrip("/") + posting_path)
+
+
+# (page state, locator class, setup, locator names - None means every locator of the class)
+PROFILE_TARGETS = [
+    ("home", locators.HomePageLocators, _open_home, None),
+    ("careers", locators.CareersPageLocators, _open_careers, None),
+    ("qa landing", locators.QAJobsPageLocators, _open_qa_landing, ["SEE_ALL_QA_JOBS_BTN"]),
+    ("qa job list", locators.QAJobsPageLocators, _open_qa_job_list,
+     [name for name in vars(locators.QAJobsPageLocators) if name.isupper() and name != "SEE_ALL_QA_JOBS_BTN"]),
+    ("lever", locators.JobsLeverPageLocators, _open_lever, None),
+]
+
+
+def _locators_of(locator_class, names):
+    names = names or [name for name in vars(locator_class) if name.isupper()]
+    return [(name, getattr(locator_class, name)) for name in names]
+
+
+def profile_locator(driver, locator, iterations):
+    """Measures one locator: match count, mean in-page evaluation cost and WebDriver find_elements latency"""
+    by, value = locator
+    result = driver.execute_script(_TIME_LOCATOR_JS, by, value, iterations)
+
+    round_trips = []
+    for _ in range(max(3, iterations // 20)):
+        start = time.perf_counter()
+        driver.find_elements(by, value)
+        round_trips.append((time.perf_counter() - start) * 1000)
+    result["webdriver_ms"] = statistics.median(round_trips)
+
+    result["suggestion"] = None
+    if by == By.XPATH:
+        for candidate in css_candidates(value):
+            if driver.execute_script(_SAME_MATCHES_JS, value, candidate):
+                css_cost = driver.execute_script(_TIME_LOCATOR_JS, By.CSS_SELECTOR, candidate, iterations)
+                result["suggestion"] = candidate
+                result["suggestion_in_page_ms"] = css_cost["in_page_ms"]
+                break
+    return result
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """Returns a list of human readable regressions: changed match counts and costs above the threshold"""
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if result["count"] != previous["count"]:
+            regressions.append(f"{key}: match count changed {previous['count']} -> {result['count']}")
+        if previous["in_page_ms"] > 0 and result["in_page_ms"] > previous["in_page_ms"] * (1 + threshold):
+            regressions.append(f"{key}: cost increased {previous['in_page_ms']:.4f} -> "
+                               f"{result['in_page_ms']:.4f} ms")
+    return regressions
+
+
+def print_report(results):
+    print(f"{'Locator':<55} {'Matches':>7} {'In page ms':>11} {'WebDriver ms':>13}")
+    for key, result in sorted(results.items(), key=lambda item: item[1]["in_page_ms"], reverse=True):
+        print(f"{key:<55} {result['count']:>7} {result['in_page_ms']:>11.4f} {result['webdriver_ms']:>13.2f}")
+
+    suggestions = [(key, result) for key, result in results.items() if result.get("suggestion")]
+    if suggestions:
+        print("\nEquivalent CSS selectors (same elements, same order):")
+        for key, result in suggestions:
+            name = key.split(".")[-1]
+            print(f"    {name} = (By.CSS_SELECTOR, '{result['suggestion']}')"
+                  f"  # {result['in_page_ms']:.4f} -> {result['suggestion_in_page_ms']:.4f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profiles the locators in config/locators.py")
+    parser.add_argument("--iterations", type=int, default=200, help="in-page evaluations per locator")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="relative cost increase over the baseline that is flagged (0.5 = +50%%)")
+    parser.add_argument("--baseline", default=Config.LOCATOR_BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args(argv)
+
+    # No implicit wait: locators without matches must not block for IMPLICIT_WAIT seconds each
+    driver_manager = DriverManager(implicit_wait=0)
+    driver = driver_manager.create_driver()
+    results = {}
+    try:
+        for state, locator_class, setup, names in PROFILE_TARGETS:
+            logger.info("Profiling %s on '%s' page...", locator_class.__name__, state)
+            setup(driver)
+            BasePage(driver).wait_for_document_ready()
+            for name, locator in _locators_of(locator_class, names):
+                results[f"{locator_class.__name__}.{name}"] = profile_locator(driver, locator, args.iterations)
+    finally:
+        driver_manager.close_driver()
+
+    print_report(results)
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        baseline = {}
+    regressions = compare_with_baseline(results, baseline, args.threshold)
+    for regression in regressions:
+        logger.warning("Locator regression - %s", regression)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({key: {"count": r["count"], "in_page_ms": r["in_page_ms"]} for key, r in results.items()},
+                      f, indent=2, sort_keys=True)
+        logger.info("Locator baseline written to %s", args.baseline)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
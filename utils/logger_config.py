@@ -1,6 +1,11 @@
 # utils/logger_config.py
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
 import os
+import queue
 from datetime import datetime
 from config.config import Config
 
@@ -8,32 +13,117 @@ from config.config import Config
 log_dir = os.path.join(Config.BASE_DIR, "logs")
 os.makedirs(log_dir, exist_ok=True)
 
+
+def _log_filename(suffix=""):
+    # JSON lines logs get their own extension so tools can tell the two formats apart
+    extension = "jsonl" if Config.LOG_FORMAT == "json" else "log"
+    return f"insider_automation_{datetime.now().strftime('%Y%m%d')}{suffix}.{extension}"
+
+
 # Create log filename with current date
-log_filename = f"insider_automation_{datetime.now().strftime('%Y%m%d')}.log"
+log_filename = _log_filename()
 log_filepath = os.path.join(log_dir, log_filename)
 
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line"""
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Renders the message (and traceback) on the calling thread, so the record no longer refers to its arguments,
+    which may change or be gone by the time the listener thread formats and writes it"""
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_traceback_formatter = logging.Formatter()
+
+
 # Define logging format for consistent output
 formatter = logging.Formatter(
     fmt='%(asctime)s | %(levelname)s | %(name)s | %(message)s',
     datefmt='%Y-%m-%d %H:%M:%S'
 )
+file_formatter = JsonLinesFormatter(datefmt='%Y-%m-%d %H:%M:%S') if Config.LOG_FORMAT == "json" else formatter
 
 # Create main logger instance
 logger = logging.getLogger("insider_logger")
 # Set logging level to DEBUG for comprehensive logging
 logger.setLevel(logging.DEBUG)  # Available levels: DEBUG, INFO, WARNING, ERROR, CRITICAL
 
+
+def _create_file_handler(filepath):
+    # delay=True: the file is opened by the listener thread on the first record, never by the test thread
+    handler = logging.FileHandler(filepath, encoding="utf-8", delay=True)
+    handler.setFormatter(file_formatter)
+    handler.setLevel(logging.DEBUG)
+    return handler
+
+
 # Console handler
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(formatter)
 console_handler.setLevel(logging.INFO)
 
 # File handler
-file_handler = logging.FileHandler(log_filepath, encoding="utf-8")
-file_handler.setFormatter(formatter)
-file_handler.setLevel(logging.DEBUG)
+file_handler = _create_file_handler(log_filepath)
+
+# The logger only enqueues records; a background listener thread formats them and does the console and file I/O
+log_queue = queue.SimpleQueue()
+queue_handler = _DeferredQueueHandler(log_queue)
+listener = None
+
+
+def _start_listener():
+    global listener
+    listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    listener.start()
+
+
+def stop_logging():
+    """Writes out every queued record and closes the log file; registered to run at interpreter shutdown"""
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+    file_handler.close()
+
 
 # Add handlers only if not already added to prevent duplicate logs
 if not logger.handlers:
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    logger.addHandler(queue_handler)
+    _start_listener()
+    atexit.register(stop_logging)
+
+
+def use_worker_log_file(worker_id):
+    """Switches the file handler to a log file of its own for a parallel test worker"""
+    global file_handler, log_filepath
+    log_filepath = os.path.join(log_dir, _log_filename(f"_worker{worker_id}"))
+
+    # Drain the queue into the old file before swapping handlers
+    stop_logging()
+    file_handler = _create_file_handler(log_filepath)
+    _start_listener()
@@ -0,0 +1,154 @@
+import heapq
+import multiprocessing
+import os
+import queue
+import sys
+import time
+import unittest
+
+from config.config import Config
+from utils.logger_config import logger
+from utils.report_writer import ReportingTestResult, set_block_sink
+from utils.test_history import ERROR, FAIL, get_test_history, quarantine
+from utils.tracer import get_tracer
+
+# Message a worker puts on the result queue once its whole shard has finished
+_SHARD_DONE = "shard_done"
+
+
+def iter_tests(suite):
+    """Flattens a (nested) unittest suite into individual test cases"""
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from iter_tests(test)
+        else:
+            yield test
+
+
+def prioritize(suite, run_quarantined=False):
+    """Returns the tests of a suite as a flat suite ordered by the test history: likely failing and fast tests first.
+
+    Tests the history marks as flaky still run, but are reported as skipped unless `run_quarantined` is set."""
+    history = get_test_history()
+    tests = {test.id(): test for test in iter_tests(suite)}
+    quarantined = set() if run_quarantined else history.quarantined()
+    ordered = unittest.TestSuite()
+    for test_id in history.order(tests):
+        if test_id in quarantined:
+            logger.warning("Quarantined flaky test: %s", test_id)
+            quarantine(tests[test_id])
+        ordered.addTest(tests[test_id])
+    return ordered
+
+
+def record_result(report, record):
+    """Writes a finished test (see utils.report_writer.test_record) to the report and the test history"""
+    report.add_test(record)
+    if not record["subtest"]:
+        get_test_history().record_test(record["id"], record["actual_outcome"], record["duration"])
+
+
+def assign_shards(test_ids, durations, workers):
+    """Splits tests into `workers` shards with roughly equal total duration.
+
+    Longest tests are placed first, each on the currently lightest shard. Tests without history are assumed to
+    take as long as the average known test."""
+    known = [durations[test_id] for test_id in test_ids if test_id in durations]
+    default = sum(known) / len(known) if known else 1.0
+
+    shards = [[] for _ in range(workers)]
+    # (total duration, shard index) - the heap always yields the lightest shard
+    loads = [(0.0, index) for index in range(workers)]
+    for test_id in sorted(test_ids, key=lambda t: durations.get(t, default), reverse=True):
+        load, index = heapq.heappop(loads)
+        shards[index].append(test_id)
+        heapq.heappush(loads, (load + durations.get(test_id, default), index))
+    return [shard for shard in shards if shard]
+
+
+def _run_shard(worker_id, test_ids, result_queue, quarantined=()):
+    """Entry point of a worker process: runs one shard with its own log file, screenshots and drivers"""
+    from utils.logger_config import use_worker_log_file
+
+    use_worker_log_file(worker_id)
+    Config.SCREENSHOT_PATH = os.path.join(Config.SCREENSHOT_PATH, f"worker_{worker_id}")
+    # Browsers can not share a disk cache, every worker keeps its own
+    Config.BROWSER_CACHE_DIR = os.path.join(Config.BROWSER_CACHE_DIR, f"worker_{worker_id}")
+    logger.info("Worker %s running %s test(s)", worker_id, len(test_ids))
+    get_tracer().set_process_name(f"worker {worker_id}")
+
+    try:
+        suite = unittest.TestLoader().loadTestsFromNames(test_ids)
+        for test in iter_tests(suite):
+            if test.id() in quarantined:
+                quarantine(test)
+        # Every finished test and soft assert block is sent to the parent as soon as it completes
+        set_block_sink(lambda block: result_queue.put({"block": {**block, "worker": worker_id}}))
+        with open(os.devnull, "w") as devnull:
+            suite.run(ReportingTestResult(devnull, False, 0, on_record=result_queue.put, worker=worker_id))
+    except Exception:
+        logger.exception("Worker %s crashed", worker_id)
+    finally:
+        # The parent merges the timings of all workers into one trace
+        result_queue.put({"trace_events": get_tracer().events})
+        result_queue.put(_SHARD_DONE)
+
+
+def run_parallel(report, suite, workers, run_quarantined=False, stream=sys.stderr):
+    """Runs the suite across `workers` processes, writing every result to `report` as soon as a worker sends it.
+
+    Shards are balanced by the durations in the test history and each shard runs its likely failing and fast tests
+    first. Results are stored in the history for the next run. Returns whether every test passed."""
+    history = get_test_history()
+    test_ids = [test.id() for test in iter_tests(suite)]
+    shards = [history.order(shard) for shard in assign_shards(test_ids, history.durations(), workers)]
+    quarantined = set() if run_quarantined else history.quarantined() & set(test_ids)
+    for test_id in sorted(quarantined):
+        logger.warning("Quarantined flaky test: %s", test_id)
+
+    context = multiprocessing.get_context("spawn")
+    result_queue = context.Queue()
+    processes = [context.Process(target=_run_shard, args=(worker_id, shard, result_queue, quarantined), daemon=True)
+                 for worker_id, shard in enumerate(shards)]
+
+    start = time.perf_counter()
+    stream.write(f"Running {len(test_ids)} test(s) on {len(processes)} worker(s)...\n")
+    for process in processes:
+        process.start()
+
+    failed = []
+    tests_run = 0
+    running = len(processes)
+    while running:
+        try:
+            record = result_queue.get(timeout=1)
+        except queue.Empty:
+            # A worker killed from outside never sends its sentinel
+            if not any(process.is_alive() for process in processes):
+                logger.error("All workers exited before reporting their results")
+                break
+            continue
+        if record == _SHARD_DONE:
+            running -= 1
+            continue
+        if "trace_events" in record:
+            get_tracer().events.extend(record["trace_events"])
+            continue
+        if "block" in record:
+            report.add_block(record["block"])
+            continue
+        record_result(report, record)
+        tests_run += not record["subtest"]
+        stream.write(f"[worker {record['worker']}] {record['outcome'].upper()} {record['description']}\n")
+        if record["outcome"] in (FAIL, ERROR):
+            failed.append(record)
+
+    for process in processes:
+        process.join()
+
+    for record in failed:
+        stream.write(f"{'=' * 70}\n{record['outcome'].upper()}: {record['description']}\n{'-' * 70}\n"
+                     f"{record['detail']}\n")
+    stream.write(f"{'-' * 70}\nRan {tests_run} test(s) in {time.perf_counter() - start:.3f}s\n")
+    stream.write("FAILED\n" if failed else "OK\n")
+    return not failed
@@ -0,0 +1,115 @@
+"""Job postings read straight from the Lever postings feed the careers job list is built from.
+
+The feed is parsed while it downloads, so postings are available before the whole response has arrived and the
+response is never held in memory as one string. Job listings rendered by QAJobsPage are cross-checked against it.
+"""
+import codecs
+import json
+import time
+import urllib.request
+from collections import Counter, namedtuple
+
+from config.config import Config
+from utils.logger_config import logger
+
+# One job posting, with the same fields as a job card on the careers job list
+Posting = namedtuple("Posting", "id position department location url")
+
+# Postings in the feed but not in the job list (silently dropped by the UI) and job cards not in the feed, as
+# (position, department, location) tuples
+FeedComparison = namedtuple("FeedComparison", "matched missing_in_ui unexpected_in_ui")
+
+_CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\n\r"
+
+
+def iter_json_array(chunks):
+    """Yields the objects of a top-level JSON array as soon as each one is complete in a stream of text chunks"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    for chunk in chunks:
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError(f"Postings feed is not a JSON array: {buffer[:200]!r}")
+                started = True
+                position += 1
+            elif buffer[position] == "]":
+                return
+            elif buffer[position] == ",":
+                position += 1
+            else:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # The object continues in the next chunk
+                    break
+                if buffer[position] not in '{["':
+                    # A number at the end of the chunk may continue in the next one ('12' of '123', '4' of '4.5');
+                    # it is only complete once the ',' or ']' after it has arrived
+                    following = end
+                    while following < len(buffer) and buffer[following] in _WHITESPACE:
+                        following += 1
+                    if following == len(buffer) or buffer[following] not in ",]":
+                        break
+                position = end
+                yield value
+    raise ValueError("Postings feed ended in the middle of the array")
+
+
+def _read_text(url, chunk_size=_CHUNK_SIZE):
+    """Yields the response body of `url` as text, chunk by chunk"""
+    request = urllib.request.Request(url, headers={"Accept": "application/json"})
+    with urllib.request.urlopen(request, timeout=Config.EXPLICIT_WAIT) as response:
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        while True:
+            chunk = response.read(chunk_size)
+            if not chunk:
+                break
+            yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+
+
+def _posting(entry):
+    categories = entry.get("categories") or {}
+    return Posting(entry.get("id"), (entry.get("text") or "").strip(), categories.get("team"),
+                   categories.get("location"), entry.get("hostedUrl"))
+
+
+def iter_postings(url=None, department=None, location=None):
+    """Yields the postings of the feed, optionally only those of one department and/or location"""
+    for entry in iter_json_array(_read_text(url or Config.LEVER_POSTINGS_API_URL)):
+        posting = _posting(entry)
+        if department and posting.department != department:
+            continue
+        if location and posting.location != location:
+            continue
+        yield posting
+
+
+def fetch_postings(url=None, department=None, location=None):
+    """Returns the postings of the feed, optionally only those of one department and/or location"""
+    start = time.perf_counter()
+    postings = list(iter_postings(url, department, location))
+    logger.info("Postings feed: %s posting(s) for %s / %s in %.0f ms", len(postings), department or "all departments",
+                location or "all locations", (time.perf_counter() - start) * 1000)
+    return postings
+
+
+def compare_with_job_rows(postings, rows):
+    """Cross-checks feed postings with job rows read from the job list ({'position', 'department', 'location'}).
+
+    Postings are matched by position, department and location; the job list does not show posting ids."""
+    expected = Counter((posting.position, posting.department, posting.location) for posting in postings)
+    shown = Counter((row["position"], row["department"], row["location"]) for row in rows)
+    return FeedComparison(sum((expected & shown).values()),
+                          list((expected - shown).elements()),
+                          list((shown - expected).elements()))
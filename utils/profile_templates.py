@@ -0,0 +1,226 @@
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+
+from config.config import Config
+from utils.logger_config import logger
+
+try:
+    # Only available on Unix; used for copy-on-write clones on filesystems that support them (btrfs, xfs)
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Linux ioctl that makes the destination file share the source's blocks until either is written
+_FICLONE = 0x40049409
+
+# Prefs written to the Firefox template's user.js: no first-run pages, telemetry, updates or background traffic
+FIREFOX_TEMPLATE_PREFS = {
+    "browser.aboutwelcome.enabled": False,
+    "browser.startup.homepage_override.mstone": "ignore",
+    "browser.startup.page": 0,
+    "startup.homepage_welcome_url": "about:blank",
+    "startup.homepage_welcome_url.additional": "",
+    "browser.shell.checkDefaultBrowser": False,
+    "datareporting.policy.dataSubmissionEnabled": False,
+    "datareporting.healthreport.uploadEnabled": False,
+    "toolkit.telemetry.enabled": False,
+    "toolkit.telemetry.reportingpolicy.firstRun": False,
+    "app.update.auto": False,
+    "app.update.enabled": False,
+    "app.normandy.enabled": False,
+    "extensions.update.enabled": False,
+    "browser.safebrowsing.malware.enabled": False,
+    "browser.safebrowsing.phishing.enabled": False,
+    "browser.newtabpage.activity-stream.feeds.topsites": False,
+    "browser.newtabpage.activity-stream.feeds.section.topstories": False,
+    "network.captive-portal-service.enabled": False,
+    "network.connectivity-service.enabled": False,
+    # Keep a large disk cache and never let Firefox shrink it on its own
+    "browser.cache.disk.enable": True,
+    "browser.cache.disk.smart_size.enabled": False,
+    "browser.cache.disk.capacity": 1048576,
+}
+
+# Arguments every Chrome session gets: no first-run UI and no background traffic
+CHROME_TEMPLATE_ARGS = [
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-sync",
+]
+
+# Files the browsers only ever replace atomically (write a temporary file, then rename) or never write again.
+# They can be hardlinked into a session copy; everything else (sqlite, leveldb logs, ...) is written in place
+# and is copied so a session can never change the template.
+_HARDLINK_SAFE_FILES = {
+    "prefs.js", "times.json", "compatibility.ini", "xulstore.json", "containers.json", "handlers.json",
+    "extensions.json", "Local State", "Preferences", "Secure Preferences", "First Run",
+}
+
+# Browser instances can not share a disk cache directory, so each live browser leases a numbered slot
+_cache_slots_in_use = set()
+_cache_slots_lock = threading.Lock()
+_reflink_supported = fcntl is not None
+
+
+def _reflink(src, dst):
+    """Clones src to dst copy-on-write; returns False where the filesystem does not support it"""
+    global _reflink_supported
+    if not _reflink_supported:
+        return False
+    try:
+        with open(src, "rb") as source, open(dst, "wb") as target:
+            fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+        return True
+    except OSError:
+        # Not supported on this filesystem; do not try again for every file
+        _reflink_supported = False
+        os.remove(dst)
+        return False
+
+
+def _clone_tree(src, dst):
+    """Copies a profile directory as cheaply as possible: copy-on-write, hardlinks for files that are only ever
+    replaced, and plain copies for the rest. Symlinks (browser lock files) are skipped."""
+    os.makedirs(dst, exist_ok=True)
+    for entry in os.scandir(src):
+        target = os.path.join(dst, entry.name)
+        if entry.is_symlink():
+            continue
+        if entry.is_dir():
+            _clone_tree(entry.path, target)
+        elif _reflink(entry.path, target):
+            continue
+        elif entry.name in _HARDLINK_SAFE_FILES:
+            try:
+                os.link(entry.path, target)
+            except OSError:
+                shutil.copy2(entry.path, target)
+        else:
+            shutil.copy2(entry.path, target)
+
+
+def _lease_cache_dir(browser):
+    with _cache_slots_lock:
+        slot = next(index for index in itertools.count() if (browser, index) not in _cache_slots_in_use)
+        _cache_slots_in_use.add((browser, slot))
+    path = os.path.join(Config.BROWSER_CACHE_DIR, browser, f"slot_{slot}")
+    os.makedirs(path, exist_ok=True)
+    return path, slot
+
+
+class SessionProfile:
+    """Profile copy and disk cache directory used by one browser session"""
+    def __init__(self, browser, path):
+        self.browser = browser
+        self.path = path
+        self.cache_dir, self._cache_slot = _lease_cache_dir(browser)
+        self._removed = False
+
+    def attach(self, driver):
+        """Ties the profile copy to the driver. remove_session_profile deletes it once the driver has been quit; should
+        that be missed, it is deleted when the driver is garbage collected"""
+        driver._insider_session_profile = self
+        weakref.finalize(driver, self.remove)
+
+    def remove(self):
+        if self._removed:
+            return
+        self._removed = True
+        shutil.rmtree(self.path, ignore_errors=True)
+        with _cache_slots_lock:
+            _cache_slots_in_use.discard((self.browser, self._cache_slot))
+
+
+def remove_session_profile(driver):
+    """Deletes the profile copy of a driver that has been quit and frees its cache slot. Drivers are part of reference
+    cycles (see utils.tracer.instrument_driver), so waiting for them to be garbage collected lets copies pile up"""
+    session_profile = getattr(driver, "_insider_session_profile", None)
+    if session_profile is not None:
+        session_profile.remove()
+
+
+class ProfileTemplate:
+    """A tuned browser profile built once and copied for every session.
+
+    `initialize(path)` launches the browser once with the profile at `path` and quits it, so the copies start
+    with everything a first launch creates. The template is rebuilt when its prefs/arguments change."""
+    def __init__(self, browser, initialize, root=None):
+        self.browser = browser
+        self.initialize = initialize
+        self.path = os.path.join(root or Config.PROFILE_TEMPLATE_DIR, browser)
+        self._stamp_path = os.path.join(self.path, ".insider_template")
+        self._lock = threading.Lock()
+
+    def _fingerprint(self):
+        settings = FIREFOX_TEMPLATE_PREFS if self.browser == "firefox" else CHROME_TEMPLATE_ARGS
+        return hashlib.sha1(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def is_current(self):
+        try:
+            with open(self._stamp_path, encoding="utf-8") as f:
+                return f.read() == self._fingerprint()
+        except OSError:
+            return False
+
+    def ensure(self):
+        """Builds the template if it is missing or outdated"""
+        with self._lock:
+            if self.is_current():
+                return self.path
+            logger.info("Building %s profile template in %s...", self.browser, self.path)
+            shutil.rmtree(self.path, ignore_errors=True)
+            parent = os.path.dirname(self.path)
+            os.makedirs(parent, exist_ok=True)
+            # Built next to its final place and renamed, so parallel workers never copy a half built template
+            build_path = tempfile.mkdtemp(prefix=f"{self.browser}-building-", dir=parent)
+            try:
+                if self.browser == "firefox":
+                    write_user_js(build_path, FIREFOX_TEMPLATE_PREFS)
+                self.initialize(build_path)
+                with open(os.path.join(build_path, ".insider_template"), "w", encoding="utf-8") as f:
+                    f.write(self._fingerprint())
+                os.rename(build_path, self.path)
+            except OSError:
+                if not self.is_current():
+                    raise
+                # Another worker finished building the same template first
+            finally:
+                shutil.rmtree(build_path, ignore_errors=True)
+            return self.path
+
+    def new_session_profile(self):
+        """Returns a fresh copy of the template for one browser session"""
+        self.ensure()
+        sessions_dir = os.path.join(os.path.dirname(self.path), "sessions")
+        os.makedirs(sessions_dir, exist_ok=True)
+        path = tempfile.mkdtemp(prefix=f"{self.browser}-", dir=sessions_dir)
+        _clone_tree(self.path, path)
+        os.remove(os.path.join(path, ".insider_template"))
+        return SessionProfile(self.browser, path)
+
+
+def write_user_js(profile_path, prefs):
+    """Writes Firefox prefs to the profile's user.js, which Firefox applies on every start"""
+    with open(os.path.join(profile_path, "user.js"), "w", encoding="utf-8") as f:
+        for name, value in prefs.items():
+            f.write(f"user_pref({json.dumps(name)}, {json.dumps(value)});\n")
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def get_profile_template(browser, initialize):
+    """Returns the process-wide template for a browser"""
+    with _templates_lock:
+        if browser not in _templates:
+            _templates[browser] = ProfileTemplate(browser, initialize)
+        return _templates[browser]
@@ -0,0 +1,188 @@
+"""Remote execution on a Selenium Grid.
+
+All remote sessions of a process share one RemoteConnection with a pool of keep-alive HTTP connections, so commands
+do not pay for a TCP (and TLS) handshake each. The connection times every command and reports the network overhead
+at exit. A local driver started with `python -m utils.remote_grid` serves as a Grid stand-in for trying it out.
+
+Usage:
+    python -m utils.remote_grid [--browser chrome] [--port 4444]
+"""
+import argparse
+import atexit
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+from selenium.webdriver.remote.client_config import ClientConfig
+from selenium.webdriver.remote.remote_connection import RemoteConnection
+
+from config.config import Config
+from utils.logger_config import logger
+
+# Capabilities of the first session that later sessions ask for again, so every session gets the same browser
+_PINNED_CAPABILITIES = ("browserName", "browserVersion", "platformName")
+
+
+class PooledRemoteConnection(RemoteConnection):
+    """RemoteConnection shared by every remote session of the process.
+
+    Up to `pool_size` connections to the Grid (the number of sessions that can send commands at the same time) are
+    kept alive. Quitting a session does not close the pool; the next session reuses its connections."""
+    def __init__(self, grid_url, pool_size):
+        client_config = ClientConfig(
+            remote_server_addr=grid_url.rstrip("/"),
+            keep_alive=True,
+            timeout=Config.EXPLICIT_WAIT * 4,
+            # RemoteConnection passes the inner dict on to urllib3.PoolManager. Not blocking: urllib3 closes the pooled
+            # connections at exit, and sessions quit after that must be able to open a new one
+            init_args_for_pool_manager={"init_args_for_pool_manager": {"maxsize": pool_size, "block": False}},
+        )
+        super().__init__(client_config=client_config)
+        # Median GET /status time in seconds, the network overhead every command pays; see measure_round_trip
+        self.round_trip = None
+        self._timings = {}
+        self._timings_lock = threading.Lock()
+
+    def execute(self, command, params):
+        start = time.perf_counter()
+        try:
+            return super().execute(command, params)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._timings_lock:
+                self._timings.setdefault(command, []).append(elapsed)
+
+    def close(self):
+        # Called by every driver.quit(); the pool outlives single sessions and is closed by shutdown()
+        pass
+
+    def shutdown(self):
+        super().close()
+
+    def connection_stats(self):
+        """Returns (connections opened, requests sent) over all hosts of the pool"""
+        pools = [self._conn.pools[key] for key in self._conn.pools.keys()]
+        return sum(pool.num_connections for pool in pools), sum(pool.num_requests for pool in pools)
+
+    def measure_round_trip(self, samples=5):
+        """Median time of GET /status in seconds: the network and HTTP cost of a command the Grid answers at once"""
+        url = f"{self._client_config.remote_server_addr}/status"
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            self._conn.request("GET", url)
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+
+    def report(self):
+        """Logs the command timings, the connection reuse and the estimated network overhead per command"""
+        with self._timings_lock:
+            timings = {command: list(values) for command, values in self._timings.items()}
+        commands = sum(len(values) for values in timings.values())
+        if not commands:
+            return
+        connections, requests = self.connection_stats()
+        logger.info("Grid: %s command(s) over %s connection(s) (%.1f requests per connection)",
+                    commands, connections, requests / max(connections, 1))
+        if self.round_trip is not None:
+            total = sum(sum(values) for values in timings.values())
+            logger.info("Grid: network overhead %.1f ms per command (GET /status), about %.1f s of %.1f s in commands",
+                        self.round_trip * 1000, self.round_trip * commands, total)
+        for command, values in sorted(timings.items(), key=lambda item: -sum(item[1]))[:10]:
+            logger.info("Grid: %-28s %5s x  median %7.1f ms  total %7.2f s", command, len(values),
+                        statistics.median(values) * 1000, sum(values))
+
+
+def load_pinned_capabilities(browser):
+    """Capabilities the first session on the Grid got for `browser`, or {} if there was none yet"""
+    try:
+        with open(Config.REMOTE_CAPABILITIES_PATH, encoding="utf-8") as f:
+            return json.load(f).get(browser, {})
+    except (OSError, ValueError):
+        return {}
+
+
+def pin_capabilities(browser, capabilities):
+    """Remembers the browser version and platform the Grid returned, so later sessions ask for the same ones"""
+    pinned = {name: capabilities[name] for name in _PINNED_CAPABILITIES if capabilities.get(name)}
+    if load_pinned_capabilities(browser) == pinned:
+        return
+    try:
+        with open(Config.REMOTE_CAPABILITIES_PATH, encoding="utf-8") as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        stored = {}
+    stored[browser] = pinned
+    os.makedirs(os.path.dirname(Config.REMOTE_CAPABILITIES_PATH), exist_ok=True)
+    with open(Config.REMOTE_CAPABILITIES_PATH, "w", encoding="utf-8") as f:
+        json.dump(stored, f, indent=2, sort_keys=True)
+    logger.info("Pinned remote %s capabilities: %s", browser, pinned)
+
+
+def forget_pinned_capabilities(browser):
+    """Drops the pinned capabilities, e.g. after the Grid's browser version changed"""
+    try:
+        with open(Config.REMOTE_CAPABILITIES_PATH, encoding="utf-8") as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return
+    stored.pop(browser, None)
+    with open(Config.REMOTE_CAPABILITIES_PATH, "w", encoding="utf-8") as f:
+        json.dump(stored, f, indent=2, sort_keys=True)
+
+
+_connection = None
+_connection_lock = threading.Lock()
+
+
+def _close_connection(connection):
+    connection.report()
+    connection.shutdown()
+
+
+def get_remote_connection():
+    """Returns the process-wide connection to Config.GRID_URL, with a pool as large as the driver pool"""
+    global _connection
+    with _connection_lock:
+        if _connection is None:
+            _connection = PooledRemoteConnection(Config.GRID_URL, Config.DRIVER_POOL_SIZE)
+            try:
+                # Measured before any session exists, so the baseline is not slowed down by the tests' own commands
+                _connection.round_trip = _connection.measure_round_trip()
+            except Exception as e:
+                logger.warning("Grid round trip could not be measured: %s", e)
+            # Reports and closes the pool once the sessions have been quit
+            atexit.register(_close_connection, _connection)
+        return _connection
+
+
+def main(argv=None):
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    from selenium.webdriver.firefox.service import Service as FirefoxService
+
+    from utils.driver_resolver import resolve_driver_path
+
+    parser = argparse.ArgumentParser(description="Serves a local browser driver as a Selenium Grid stand-in")
+    parser.add_argument("--browser", default=Config.REMOTE_BROWSER, choices=["chrome", "firefox"])
+    parser.add_argument("--port", type=int, default=4444)
+    args = parser.parse_args(argv)
+
+    service_class = ChromeService if args.browser == "chrome" else FirefoxService
+    service = service_class(resolve_driver_path(args.browser), port=args.port)
+    service.start()
+    logger.info("Grid stand-in for %s listening at %s (Ctrl+C to stop)", args.browser, service.service_url)
+    try:
+        while service.is_connectable():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
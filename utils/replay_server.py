@@ -0,0 +1,276 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from selenium.common import WebDriverException
+
+from config.config import Config
+from utils.logger_config import logger
+
+# Lists the current document and every subresource/XHR/fetch the page has requested so far, with its initiator type
+_REQUESTED_URLS_JS = """
+return [[document.URL, 'navigation']].concat(
+    performance.getEntriesByType('resource').map(entry => [entry.name, entry.initiatorType]));
+"""
+
+# Resource Timing does not tell the request method; requests of these initiators may have been POSTs
+_SCRIPTED_INITIATORS = ("xmlhttprequest", "fetch", "beacon")
+
+# Response bodies of these types contain absolute URLs that are rewritten to the local server when replaying
+_TEXT_CONTENT_TYPES = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+
+_USER_AGENT = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+               "Chrome/126.0 Safari/537.36")
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _path_and_query(url):
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+class NetworkArchive:
+    """Recorded responses on disk: index.json maps each URL to its status, content type and body file"""
+    def __init__(self, path=Config.REPLAY_ARCHIVE_PATH):
+        self.path = path
+        self.index_path = os.path.join(path, "index.json")
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, url):
+        return url in self.index
+
+    def origins(self):
+        return sorted({_origin(url) for url in self.index})
+
+    def add(self, url, status, content_type, body):
+        body_file = hashlib.sha1(url.encode("utf-8")).hexdigest() + ".bin"
+        os.makedirs(os.path.join(self.path, "bodies"), exist_ok=True)
+        with open(os.path.join(self.path, "bodies", body_file), "wb") as f:
+            f.write(body)
+        with self._lock:
+            self.index[url] = {"status": status, "content_type": content_type, "body": body_file}
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock:
+            with open(self.index_path, "w", encoding="utf-8") as f:
+                json.dump(self.index, f, indent=2, sort_keys=True)
+
+    def lookup(self, origin, path_and_query):
+        """Returns (status, content_type, body) for a request, ignoring the query string if needed"""
+        entry = self.index.get(origin + path_and_query)
+        if entry is None:
+            # Cache busting parameters (e.g. ?ver=123) often change between runs, fall back to the path alone
+            path = path_and_query.split("?", 1)[0]
+            entry = next((e for url, e in self.index.items()
+                          if _origin(url) == origin and _path_and_query(url).split("?", 1)[0] == path), None)
+        if entry is None:
+            return None
+        with open(os.path.join(self.path, "bodies", entry["body"]), "rb") as f:
+            return entry["status"], entry["content_type"], f.read()
+
+
+class NetworkRecorder:
+    """Captures the pages and XHR/JSON responses the flow touches into a NetworkArchive.
+
+    `capture` is registered as a navigation listener so each page is captured before the flow leaves it. Chrome
+    sessions (started with the performance log in record mode) archive the bodies the browser itself received:
+    the GET responses are read from the performance log and their bodies fetched with CDP Network.getResponseBody.
+    Other browsers have no such access, so the URLs of the current page (document plus Resource Timing entries)
+    are downloaded again. Those downloads lack the browser's cookies and headers, and since Resource Timing does not
+    tell the method, XHR/fetch requests are left out there: record with Chrome to capture them."""
+    def __init__(self, archive=None):
+        self.archive = archive or NetworkArchive()
+
+    def capture(self, driver):
+        if hasattr(driver, "execute_cdp_cmd") and "performance" in (driver.log_types or ()):
+            self._capture_cdp(driver)
+        else:
+            self._capture_resource_timing(driver)
+        self.archive.save()
+
+    def _capture_cdp(self, driver):
+        # The performance log holds the DevTools events since the last read, from every tab
+        requests = {}
+        for entry in driver.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            params = message.get("params", {})
+            request = requests.setdefault(params.get("requestId"), {})
+            if message["method"] == "Network.requestWillBeSent":
+                request["method"] = params["request"]["method"]
+            elif message["method"] == "Network.responseReceived":
+                response = params["response"]
+                request.update(url=response["url"], status=response["status"], content_type=response["mimeType"])
+            elif message["method"] == "Network.loadingFinished":
+                request["finished"] = True
+        for request_id, request in requests.items():
+            url = request.get("url", "").split("#", 1)[0]
+            if (request.get("method") != "GET" or not request.get("finished")
+                    or not url.startswith(("http://", "https://")) or url in self.archive):
+                continue
+            try:
+                result = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            except WebDriverException as e:
+                # Chrome drops the bodies of pages that are gone and of large responses
+                logger.warning("Browser no longer has the body of %s, downloading it: %s", url, e.msg)
+                self._fetch(url)
+                continue
+            body = result["body"]
+            body = base64.b64decode(body) if result.get("base64Encoded") else body.encode("utf-8")
+            self.archive.add(url, request["status"], request["content_type"], body)
+
+    def _capture_resource_timing(self, driver):
+        try:
+            requested = driver.execute_script(_REQUESTED_URLS_JS)
+        except Exception as e:
+            logger.warning("Could not list requested URLs for recording: %s", e)
+            return
+        for url, initiator in requested:
+            url = url.split("#", 1)[0]
+            if not url.startswith(("http://", "https://")) or url in self.archive:
+                continue
+            if initiator in _SCRIPTED_INITIATORS:
+                logger.debug("Not recording %s request %s, its method is unknown without CDP", initiator, url)
+                continue
+            self._fetch(url)
+
+    def _fetch(self, url):
+        request = urllib.request.Request(url, headers={"User-Agent": _USER_AGENT})
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                self.archive.add(url, response.status, response.headers.get("Content-Type", ""), response.read())
+        except urllib.error.HTTPError as e:
+            self.archive.add(url, e.code, e.headers.get("Content-Type", ""), e.read())
+        except (urllib.error.URLError, OSError) as e:
+            logger.warning("Could not record %s: %s", url, e)
+
+
+class ReplayServer:
+    """Serves a NetworkArchive from local HTTP servers, one per recorded origin, with the same URL paths.
+
+    Absolute URLs of recorded origins inside HTML, CSS, JS and JSON bodies are rewritten to the matching local
+    origin, so links and XHR calls stay on the replay servers."""
+    def __init__(self, archive=None, host="127.0.0.1"):
+        self.archive = archive or NetworkArchive()
+        self.host = host
+        self.origin_map = {}
+        self._servers = []
+
+    def start(self):
+        """Starts a server for every recorded origin. Raises RuntimeError when Config.BASE_URL was never recorded,
+        since the suite would otherwise quietly run against the live sites"""
+        if _origin(Config.BASE_URL) not in self.archive.origins():
+            raise RuntimeError(f"Replay archive {self.archive.path} has no recording of {Config.BASE_URL}, "
+                               f"record one with INSIDER_NETWORK_MODE=record first")
+        for origin in self.archive.origins():
+            server = ThreadingHTTPServer((self.host, 0), self._handler_for(origin))
+            server.daemon_threads = True
+            self.origin_map[origin] = f"http://{self.host}:{server.server_port}"
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self._servers.append(server)
+        logger.info("Replay server started for %s origin(s)", len(self._servers))
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
+
+    def local_url(self, url):
+        """Maps a recorded URL to the URL it is served at locally. URLs of origins that were not recorded are returned
+        unchanged, with a warning: they reach the live site"""
+        origin = _origin(url)
+        if origin not in self.origin_map:
+            logger.warning("%s is not in the replay archive, requests to it go to the live site", origin)
+            return url
+        return self.origin_map[origin] + url[len(origin):]
+
+    def apply_to_config(self):
+        """Points the suite's URLs at the replay servers"""
+        Config.BASE_URL = self.local_url(Config.BASE_URL)
+        Config.QA_JOBS_URL = self.local_url(Config.QA_JOBS_URL)
+        Config.LEVER_BASE_URL = self.local_url(Config.LEVER_BASE_URL)
+        Config.LEVER_POSTINGS_API_URL = self.local_url(Config.LEVER_POSTINGS_API_URL)
+
+    def rewrite(self, body):
+        text = body.decode("utf-8", errors="surrogateescape")
+        for origin, local in self.origin_map.items():
+            host, local_host = origin.split("://", 1)[1], local.split("://", 1)[1]
+            for scheme in ("https", "http"):
+                text = text.replace(f"{scheme}://{host}", local)
+                text = text.replace(f"{scheme}:\\/\\/{host}", local.replace("/", "\\/"))
+            text = text.replace(f"//{host}", f"//{local_host}")
+        return text.encode("utf-8", errors="surrogateescape")
+
+    def _handler_for(self, origin):
+        replay_server = self
+
+        class _ReplayHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._respond(include_body=True)
+
+            def do_HEAD(self):
+                self._respond(include_body=False)
+
+            def _respond(self, include_body):
+                recorded = replay_server.archive.lookup(origin, self.path)
+                if recorded is None:
+                    self.send_error(404, "Not recorded")
+                    return
+                status, content_type, body = recorded
+                if content_type.startswith(_TEXT_CONTENT_TYPES):
+                    body = replay_server.rewrite(body)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                # XHR calls from the replayed pages go to other local origins
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                if include_body:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("replay %s: " + format, origin, *args)
+
+        return _ReplayHandler
+
+
+_replay_server = None
+_recorder = None
+
+
+def start_network_mode(driver):
+    """Applies Config.NETWORK_MODE to a test's driver and returns the recorder when recording.
+
+    In replay mode the replay server is started once per process and Config is pointed at it. In record mode
+    the recorder captures every page the page objects leave; call its `capture` once more before quitting."""
+    global _replay_server, _recorder
+    if Config.NETWORK_MODE == "replay":
+        if _replay_server is None:
+            _replay_server = ReplayServer().start()
+            _replay_server.apply_to_config()
+        return None
+    if Config.NETWORK_MODE == "record":
+        from pages.base_page import add_navigation_listener
+
+        if _recorder is None:
+            _recorder = NetworkRecorder()
+        add_navigation_listener(driver, _recorder.capture)
+        return _recorder
+    return None
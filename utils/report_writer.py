@@ -0,0 +1,324 @@
+"""Test report written while the suite runs: JUnit XML for CI and an HTML index for people.
+
+Every finished test is appended to both files at once, so the report of a crashed or interrupted run is complete up
+to its last test. Soft assert blocks (assert_all) get an HTML row as soon as they finish and are listed in the
+<system-out> of their test case in the XML, so the JUnit counters only count tests. The XML stays well-formed after
+every write: the closing tag is rewritten behind the new test case and the counters live in a padded header that is
+overwritten in place.
+The HTML index is a plain table without per-test markup beyond one row, with collapsed details and lazily loaded
+screenshot thumbnails, so it opens quickly for thousands of tests.
+"""
+import html
+import os
+import re
+import socket
+import threading
+import time
+import unittest
+from datetime import datetime
+from xml.sax.saxutils import escape, quoteattr
+
+from utils.logger_config import logger
+from utils.test_history import ERROR, FAIL, PASS, SKIP
+
+# Characters XML 1.0 does not allow, e.g. terminal colour codes in tracebacks
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+# Room left in the XML header for the counters to grow
+_HEADER_SPARE = 64
+# Attachments shown as thumbnails, anything else is linked by name
+_IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+# Seconds a test's screenshots may still take to be written when its result is reported
+_SCREENSHOT_TIMEOUT = 10
+
+_HTML_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 1.5em; color: #222; }}
+table {{ border-collapse: collapse; width: 100%; table-layout: fixed; }}
+th, td {{ border-bottom: 1px solid #ddd; padding: 4px 8px; text-align: left; vertical-align: top;
+         overflow-wrap: anywhere; }}
+th:nth-child(1) {{ width: 5em; }} th:nth-child(3) {{ width: 6em; }} th:nth-child(4) {{ width: 4em; }}
+tr.pass td:first-child {{ color: #2e7d32; }} tr.fail td:first-child, tr.error td:first-child {{ color: #c62828; }}
+tr.skip td:first-child {{ color: #777; }}
+tr.block td:nth-child(2) {{ padding-left: 2em; color: #555; }}
+pre {{ white-space: pre-wrap; font-size: 12px; margin: 4px 0; }}
+img {{ max-width: 160px; border: 1px solid #ccc; margin: 4px 4px 0 0; }}
+body.failures-only tr.pass, body.failures-only tr.skip {{ display: none; }}
+</style>
+<script>
+document.addEventListener("DOMContentLoaded", () => {{
+    const count = (selector) => document.querySelectorAll("tr.test" + selector).length;
+    document.getElementById("summary").textContent = count("") + " tests: " + count(".pass") + " passed, " +
+        count(".fail") + " failed, " + count(".error") + " errors, " + count(".skip") + " skipped";
+    document.getElementById("failures-only").addEventListener("change", (event) => {{
+        document.body.classList.toggle("failures-only", event.target.checked);
+    }});
+}});
+</script>
+</head>
+<body>
+<h1>{title}</h1>
+<p>Started {started} on {host}. <span id="summary"></span></p>
+<p><label><input type="checkbox" id="failures-only"> Failures only</label></p>
+<table>
+<thead><tr><th>Status</th><th>Test</th><th>Duration</th><th>Worker</th></tr></thead>
+<tbody>
+"""
+
+_HTML_FOOT = """</tbody>
+</table>
+<p>Finished {finished}.</p>
+</body>
+</html>
+"""
+
+
+def test_record(test, outcome, detail="", duration=0.0, subtest=None, worker=None):
+    """Describes a finished test as a plain dict, the form results are written and sent between processes in"""
+    reported = subtest or test
+    return {
+        "id": reported.id(),
+        "module": type(test).__module__,
+        "class_name": type(test).__name__,
+        "description": str(reported),
+        "outcome": outcome,
+        # What a quarantined test really did while reported as skipped; the test history counts this one
+        "actual_outcome": getattr(test, "quarantined_outcome", None) or outcome,
+        "detail": detail,
+        "duration": duration,
+        "worker": worker,
+        "subtest": subtest is not None,
+        "screenshots": _screenshot_paths(test),
+    }
+
+
+def _screenshot_paths(test):
+    """Paths of the screenshots the test took (see BaseTest.take_screenshot_on_failure), once they are written"""
+    paths = []
+    for handle in getattr(test, "report_screenshots", ()):
+        try:
+            path = handle.result(timeout=_SCREENSHOT_TIMEOUT)
+        except Exception as e:
+            logger.warning("Screenshot not linked in the report: %s", e)
+            continue
+        if path:
+            paths.append(path)
+    return paths
+
+
+_block_sink = None
+
+
+def set_block_sink(callback):
+    """Sets where soft assert block records go: the report itself, or the result queue in a worker process"""
+    global _block_sink
+    _block_sink = callback
+
+
+def report_block(test_id, name, outcome, duration, detail=""):
+    """Reports a finished soft assert block of a running test"""
+    if _block_sink is not None:
+        _block_sink({"test_id": test_id, "name": name, "outcome": outcome, "duration": duration,
+                     "detail": detail, "worker": None})
+
+
+class ReportWriter:
+    """Appends tests and soft assert blocks to `<name>_<timestamp>.xml` and `.html` in `directory`"""
+    def __init__(self, directory, name="InsiderTestReport"):
+        os.makedirs(directory, exist_ok=True)
+        started = datetime.now()
+        base = os.path.join(directory, f"{name}_{started.strftime('%Y-%m-%d_%H-%M-%S')}")
+        self.xml_path = base + ".xml"
+        self.html_path = base + ".html"
+        self.directory = directory
+        self._name = name
+        self._started = started
+        self._start = time.perf_counter()
+        self._counts = {"tests": 0, "failures": 0, "errors": 0, "skipped": 0}
+        # Soft assert blocks of the running tests, written into their test case's <system-out> when it finishes
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+        self._xml = open(self.xml_path, "w+b")
+        self._header_width = len(self._xml_header()) + _HEADER_SPARE
+        self._xml.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
+        self._header_offset = self._xml.tell()
+        self._write_xml_header()
+        self._xml.write(b"\n")
+        self._cases_end = self._xml.tell()
+        self._write_xml_case(b"")
+
+        self._html = open(self.html_path, "w", encoding="utf-8")
+        self._html.write(_HTML_HEAD.format(title=html.escape(f"{name} {started:%Y-%m-%d %H:%M:%S}"),
+                                           started=f"{started:%Y-%m-%d %H:%M:%S}",
+                                           host=html.escape(socket.gethostname())))
+        self._html.flush()
+        logger.info("Writing test report to %s", self.html_path)
+
+    def add_test(self, record):
+        """Writes a finished test (see test_record)"""
+        outcome = record["outcome"]
+        element = self._xml_outcome(outcome, record["detail"])
+        with self._lock:
+            output = "".join(self._blocks.pop(record["id"], []))
+        # Picked up by the JUnit attachments plugin of Jenkins, a plain log line elsewhere
+        output += "".join(f"[[ATTACHMENT|{path}]]\n" for path in record["screenshots"])
+        if output:
+            element += f"<system-out>{escape(_xml_text(output))}</system-out>"
+        class_name = quoteattr(_xml_text(f"{record['module']}.{record['class_name']}"))
+        test_name = quoteattr(_xml_text(record["id"][len(record["module"]) + len(record["class_name"]) + 2:]))
+        case = (f'  <testcase classname={class_name} name={test_name} time="{record["duration"]:.3f}">'
+                f"{element}</testcase>\n")
+        row = (f'<tr class="test {outcome}"><td>{outcome.upper()}</td>'
+               f'<td>{html.escape(record["id"])}{self._html_detail(record["detail"])}'
+               f'{self._html_screenshots(record["screenshots"])}</td>'
+               f'<td>{record["duration"]:.2f} s</td><td>{_worker(record["worker"])}</td></tr>\n')
+        self._add(outcome, case, row)
+
+    def add_block(self, block):
+        """Writes a finished soft assert block of a test still running (see report_block)"""
+        outcome = block["outcome"]
+        line = f'Soft assert block "{block["name"]}": {outcome.upper()} in {block["duration"]:.2f} s\n'
+        if block["detail"] and outcome != PASS:
+            line += "".join(f"    {detail_line}\n" for detail_line in block["detail"].strip().splitlines())
+        row = (f'<tr class="block {outcome}"><td>{outcome.upper()}</td>'
+               f'<td>{html.escape(block["test_id"])} &rsaquo; {html.escape(block["name"])}'
+               f'{self._html_detail(block["detail"])}</td>'
+               f'<td>{block["duration"]:.2f} s</td><td>{_worker(block["worker"])}</td></tr>\n')
+        with self._lock:
+            self._blocks.setdefault(block["test_id"], []).append(line)
+            self._html.write(row)
+            self._html.flush()
+
+    def close(self):
+        """Adds the end of the HTML page and the final run time"""
+        with self._lock:
+            self._html.write(_HTML_FOOT.format(finished=f"{datetime.now():%Y-%m-%d %H:%M:%S}"))
+            self._html.close()
+            self._write_xml_header()
+            self._xml.close()
+        logger.info("Test report: %s (JUnit XML: %s)", self.html_path, self.xml_path)
+
+    def _add(self, outcome, case, row):
+        with self._lock:
+            self._counts["tests"] += 1
+            if outcome == FAIL:
+                self._counts["failures"] += 1
+            elif outcome == ERROR:
+                self._counts["errors"] += 1
+            elif outcome == SKIP:
+                self._counts["skipped"] += 1
+            self._write_xml_case(case.encode("utf-8"))
+            self._write_xml_header()
+            self._xml.flush()
+            self._html.write(row)
+            self._html.flush()
+
+    def _xml_header(self):
+        counts = " ".join(f'{key}="{value}"' for key, value in self._counts.items())
+        return (f"<testsuite name={quoteattr(self._name)} timestamp=\"{self._started:%Y-%m-%dT%H:%M:%S}\" "
+                f"hostname={quoteattr(socket.gethostname())} {counts} "
+                f"time=\"{time.perf_counter() - self._start:.3f}\"")
+
+    def _write_xml_header(self):
+        # Whitespace before '>' is valid XML, it keeps the header the same length however the counters grow
+        self._xml.seek(self._header_offset)
+        self._xml.write((self._xml_header().ljust(self._header_width) + ">").encode("utf-8"))
+
+    def _write_xml_case(self, case):
+        self._xml.seek(self._cases_end)
+        self._xml.write(case)
+        self._cases_end = self._xml.tell()
+        self._xml.write(b"</testsuite>\n")
+        self._xml.truncate()
+
+    @staticmethod
+    def _xml_outcome(outcome, detail):
+        if outcome == PASS:
+            return ""
+        detail = _xml_text(detail or "")
+        message = quoteattr(detail.strip().splitlines()[-1][:200] if detail.strip() else outcome)
+        tag = {FAIL: "failure", ERROR: "error", SKIP: "skipped"}[outcome]
+        return f"<{tag} message={message}>{escape(detail)}</{tag}>"
+
+    @staticmethod
+    def _html_detail(detail):
+        if not detail:
+            return ""
+        return f"<details><summary>Details</summary><pre>{html.escape(detail)}</pre></details>"
+
+    def _html_screenshots(self, paths):
+        links = []
+        for path in paths:
+            relative = html.escape(os.path.relpath(path, self.directory).replace(os.sep, "/"))
+            if path.lower().endswith(_IMAGE_EXTENSIONS):
+                links.append(f'<a href="{relative}"><img src="{relative}" loading="lazy" alt="screenshot"></a>')
+            else:
+                # e.g. the zip of the screenshots and DOM snapshots of the steps before a failure
+                links.append(f'<a href="{relative}">{html.escape(os.path.basename(path))}</a> ')
+        return f"<div>{''.join(links)}</div>" if links else ""
+
+
+def _xml_text(text):
+    return _INVALID_XML_CHARS.sub("", text)
+
+
+def _worker(worker):
+    return "" if worker is None else str(worker)
+
+
+class ReportingTestResult(unittest.TextTestResult):
+    """Text result that turns every finished test and failing subtest into a record (see test_record) and hands it
+    to `on_record` right away"""
+    def __init__(self, stream, descriptions, verbosity, on_record=None, worker=None, **kwargs):
+        super().__init__(stream, descriptions, verbosity, **kwargs)
+        self.on_record = on_record
+        self.worker = worker
+        self._test_start = None
+
+    def startTest(self, test):
+        super().startTest(test)
+        self._test_start = time.perf_counter()
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        self._test_start = None
+
+    def _record(self, test, outcome, detail="", subtest=None):
+        if self.on_record is not None:
+            # Errors of class and module fixtures (_ErrorHolder) are reported without a startTest
+            duration = time.perf_counter() - self._test_start if self._test_start is not None else 0.0
+            self.on_record(test_record(test, outcome, detail, duration, subtest, self.worker))
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self._record(test, PASS)
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._record(test, FAIL, self.failures[-1][1])
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._record(test, ERROR, self.errors[-1][1])
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._record(test, SKIP, reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self._record(test, PASS, "Expected failure:\n" + self.expectedFailures[-1][1])
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self._record(test, FAIL, "Unexpected success: the test is marked as an expected failure")
+
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        if err is not None:
+            outcome = FAIL if issubclass(err[0], test.failureException) else ERROR
+            self._record(test, outcome, self._exc_info_to_string(err, test), subtest)
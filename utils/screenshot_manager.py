@@ -1,8 +1,36 @@
+import hashlib
+import io
+import json
 import os
+import threading
+import zipfile
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from config.config import Config
 from utils.logger_config import logger
 
+try:
+    # Optional: only needed to downscale or re-encode screenshots
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# A screenshot and DOM snapshot kept in memory; written only if a later step fails
+Frame = namedtuple("Frame", "label captured_at url title png dom")
+
+# URL, title and markup of the page in a single round trip
+_DOM_SNAPSHOT_JS = """
+const doctype = document.doctype ? '<!DOCTYPE ' + document.doctype.name + '>\\n' : '';
+return [location.href, document.title, doctype + document.documentElement.outerHTML];
+"""
+
+# Single background thread that processes and writes screenshots in the order they were taken
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screenshot-writer")
+# Content hash -> file path of every screenshot written by this process, to skip identical frames
+_written_hashes = {}
+_written_hashes_lock = threading.Lock()
+
 
 def get_timestamp():
     """Returns formatted timestamp for file naming"""
@@ -10,34 +38,176 @@ def get_timestamp():
     return datetime.now().strftime("%Y%m%d_%H%M%S")
 
 
+class ScreenshotHandle:
+    """Returned by take_screenshot right away, while the screenshot is still being written"""
+    def __init__(self, future):
+        self._future = future
+
+    def done(self):
+        return self._future.done()
+
+    def result(self, timeout=None):
+        """Waits for the write and returns the file path, or None if it failed"""
+        return self._future.result(timeout)
+
+
+def _encode(png_bytes, image_format, max_width, quality):
+    """Downscales and re-encodes the PNG; without Pillow the original PNG is kept"""
+    if Image is None or (image_format == "png" and not max_width):
+        return png_bytes, "png"
+    image = Image.open(io.BytesIO(png_bytes))
+    if max_width and image.width > max_width:
+        image = image.resize((max_width, round(image.height * max_width / image.width)))
+    if image_format in ("jpeg", "jpg"):
+        image = image.convert("RGB")
+    output = io.BytesIO()
+    image.save(output, format=image_format.upper().replace("JPG", "JPEG"), quality=quality)
+    return output.getvalue(), "jpg" if image_format in ("jpeg", "jpg") else image_format
+
+
+def _write_screenshot(png_bytes, name, timestamp, directory, image_format, max_width, quality):
+    """Runs on the writer thread: dedup, optional re-encoding and the disk write"""
+    try:
+        digest = hashlib.sha1(png_bytes).hexdigest()
+        with _written_hashes_lock:
+            existing = _written_hashes.get(digest)
+        if existing and os.path.exists(existing):
+            logger.debug("Screenshot '%s' is identical to %s, not written again", name, existing)
+            return existing
+
+        data, extension = _encode(png_bytes, image_format, max_width, quality)
+        os.makedirs(directory, exist_ok=True)
+        filepath = os.path.join(directory, f"{name}_{timestamp}.{extension}")
+        with open(filepath, "wb") as f:
+            f.write(data)
+        with _written_hashes_lock:
+            _written_hashes[digest] = filepath
+        return filepath
+    except Exception as e:
+        # Log error if screenshot processing or saving fails
+        logger.error("Error saving screenshot: %s", e)
+        return None
+
+
+class FrameBuffer:
+    """Ring buffer of the last `max_frames` frames whose screenshots and DOM snapshots together stay within
+    `max_bytes`; the oldest frames are dropped first"""
+    def __init__(self, max_frames, max_bytes):
+        self.max_bytes = max_bytes
+        self._frames = deque(maxlen=max_frames)
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._frames)
+
+    @property
+    def size(self):
+        """Bytes held by the buffered frames"""
+        return self._bytes
+
+    def add(self, frame):
+        if len(self._frames) == self._frames.maxlen:
+            self._bytes -= _frame_size(self._frames[0])
+        self._frames.append(frame)
+        self._bytes += _frame_size(frame)
+        # The newest frame is always kept, even when it alone is over the budget
+        while self._bytes > self.max_bytes and len(self._frames) > 1:
+            self._bytes -= _frame_size(self._frames.popleft())
+
+    def drain(self):
+        """Returns the buffered frames, oldest first, and empties the buffer"""
+        frames = list(self._frames)
+        self._frames.clear()
+        self._bytes = 0
+        return frames
+
+
+def _frame_size(frame):
+    return len(frame.png) + len(frame.dom)
+
+
+def _write_frames(frames, name, timestamp, directory):
+    """Runs on the writer thread: stores the frames in one zip with a manifest, DOM snapshots compressed"""
+    try:
+        os.makedirs(directory, exist_ok=True)
+        filepath = os.path.join(directory, f"{name}_{timestamp}.zip")
+        manifest = []
+        with zipfile.ZipFile(filepath, "w") as archive:
+            for number, frame in enumerate(frames, start=1):
+                prefix = f"{number:02d}_{frame.label}"
+                # PNG is compressed already, deflating it again only costs time
+                archive.writestr(f"{prefix}.png", frame.png, compress_type=zipfile.ZIP_STORED)
+                archive.writestr(f"{prefix}.html", frame.dom, compress_type=zipfile.ZIP_DEFLATED)
+                manifest.append({"label": frame.label, "captured_at": frame.captured_at, "url": frame.url,
+                                 "title": frame.title, "screenshot": f"{prefix}.png", "dom": f"{prefix}.html"})
+            archive.writestr("manifest.json", json.dumps(manifest, indent=2), compress_type=zipfile.ZIP_DEFLATED)
+        return filepath
+    except Exception as e:
+        logger.error("Error saving the step frames: %s", e)
+        return None
+
+
 class ScreenshotManager:
     def __init__(self, driver):
         self.driver = driver
         self.config = Config()
-        self._create_screenshot_dir()
+        # Frames of the last steps, only written to disk by flush_frames() when a step fails
+        self.frames = FrameBuffer(self.config.FRAME_BUFFER_SIZE, self.config.FRAME_BUFFER_BYTES)
+
+    def record_frame(self, label):
+        """Keeps a screenshot and DOM snapshot of the current page in memory, nothing is written to disk.
+        Returns the Frame, or None if it could not be taken"""
+        if not self.config.SCREENSHOT_ENABLED:
+            return None
+        try:
+            png_bytes = self.driver.get_screenshot_as_png()
+            url, title, dom = self.driver.execute_script(_DOM_SNAPSHOT_JS)
+        except Exception as e:
+            logger.error("Error recording step frame: %s", e)
+            return None
+        frame = Frame(label, datetime.now().isoformat(timespec="milliseconds"), url, title, png_bytes,
+                      dom.encode("utf-8"))
+        self.frames.add(frame)
+        return frame
 
-    def _create_screenshot_dir(self):
-        """Creates screenshot directory if it doesn't exist"""
-        if not os.path.exists(self.config.SCREENSHOT_PATH):
-            # Create directory structure for storing screenshots
-            os.makedirs(self.config.SCREENSHOT_PATH)
+    def flush_frames(self, name="frames"):
+        """Writes the buffered frames to a zip in the background and returns a ScreenshotHandle, or None when there
+        are none"""
+        frames = self.frames.drain()
+        if not frames:
+            return None
+        logger.info("Writing the last %s step frame(s) to disk", len(frames))
+        return ScreenshotHandle(_writer.submit(_write_frames, frames, name, get_timestamp(),
+                                               self.config.SCREENSHOT_PATH))
+
+    def capture_failure(self, name):
+        """Records the failing page as the last frame, then writes its screenshot as `<name>_failed` and every
+        buffered frame as `<name>_steps`. Returns the ScreenshotHandles of the files"""
+        frame = self.record_frame(f"{name}_failed")
+        handles = []
+        if frame is not None:
+            handles.append(self._write(frame.png, f"{name}_failed"))
+        handles.append(self.flush_frames(f"{name}_steps"))
+        return [handle for handle in handles if handle is not None]
 
     def take_screenshot(self, name="screenshot"): #default name is screenshot
-        """Takes screenshot and saves it with timestamp"""
+        """Grabs the screenshot bytes and returns a ScreenshotHandle at once; processing and writing the file
+        happen on a background thread"""
         # Skip screenshot if disabled in configuration
         if not self.config.SCREENSHOT_ENABLED:
             return None
 
-        timestamp = get_timestamp()
-        filename = f"{name}_{timestamp}.png"
-        filepath = os.path.join(self.config.SCREENSHOT_PATH, filename)
-
         try:
-            # Capture and save screenshot to specified file path
-            self.driver.save_screenshot(filepath)
-            return filepath
+            # The only part the test thread waits for: the browser encoding the frame
+            png_bytes = self.driver.get_screenshot_as_png()
         except Exception as e:
             # Log error if screenshot capture fails
-            logger.error(f"Error taking screenshot: {e}")
+            logger.error("Error taking screenshot: %s", e)
             return None
 
+        return self._write(png_bytes, name)
+
+    def _write(self, png_bytes, name):
+        return ScreenshotHandle(_writer.submit(
+            _write_screenshot, png_bytes, name, get_timestamp(), self.config.SCREENSHOT_PATH,
+            self.config.SCREENSHOT_FORMAT, self.config.SCREENSHOT_MAX_WIDTH, self.config.SCREENSHOT_QUALITY))
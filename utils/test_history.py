@@ -0,0 +1,190 @@
+"""Local SQLite history of test and step durations and outcomes.
+
+run_tests.py uses it to run likely-failing and fast tests first, to quarantine flaky tests and to balance parallel
+shards by duration. Run this module to print the collected statistics:
+    python -m utils.test_history
+"""
+import functools
+import os
+import sqlite3
+import statistics
+import sys
+import threading
+import unittest
+from collections import namedtuple
+from datetime import datetime
+
+from config.config import Config
+
+PASS, FAIL, ERROR, SKIP = "pass", "fail", "error", "skip"
+
+# Statistics of one test over its last HISTORY_WINDOW runs (skips excluded)
+TestStats = namedtuple("TestStats", "test_id runs failures failure_score flip_rate duration flaky")
+
+# Score used for tests without history: between "always passes" (0) and "always fails" (1), so new tests run early
+_UNKNOWN_FAILURE_SCORE = 0.5
+# Weight of each older run in the failure score; the latest run counts most
+_FAILURE_SCORE_DECAY = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, started_at TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS test_results (
+    id INTEGER PRIMARY KEY, run_id INTEGER NOT NULL, test_id TEXT NOT NULL, outcome TEXT NOT NULL,
+    duration REAL NOT NULL, recorded_at TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS step_results (
+    id INTEGER PRIMARY KEY, run_id INTEGER NOT NULL, test_id TEXT NOT NULL, step TEXT NOT NULL,
+    outcome TEXT NOT NULL, duration REAL NOT NULL, recorded_at TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS test_results_by_test ON test_results (test_id, id);
+CREATE INDEX IF NOT EXISTS step_results_by_test ON step_results (test_id, step, id);
+"""
+
+# Parallel workers inherit the run id from the runner through the environment
+_RUN_ID_VARIABLE = "INSIDER_HISTORY_RUN_ID"
+
+
+class TestHistory:
+    """Test and step results of every run in a SQLite database. Safe to use from parallel worker processes"""
+    def __init__(self, path=Config.TEST_HISTORY_PATH, window=Config.HISTORY_WINDOW):
+        self.path = path
+        self.window = window
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Writers in other processes hold the lock briefly, wait for them instead of failing
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._stats = None
+
+    def _execute(self, sql, parameters=()):
+        with self._lock, self._connection:
+            return self._connection.execute(sql, parameters)
+
+    def start_run(self):
+        """Starts a new run; worker processes started afterwards record their results under the same run"""
+        run_id = self._execute("INSERT INTO runs (started_at) VALUES (?)",
+                               (datetime.now().isoformat(timespec="seconds"),)).lastrowid
+        os.environ[_RUN_ID_VARIABLE] = str(run_id)
+        return run_id
+
+    def run_id(self):
+        if _RUN_ID_VARIABLE not in os.environ:
+            # Tests started without run_tests.py (e.g. python -m unittest) get a run of their own
+            self.start_run()
+        return int(os.environ[_RUN_ID_VARIABLE])
+
+    def record_test(self, test_id, outcome, duration):
+        self._execute("INSERT INTO test_results (run_id, test_id, outcome, duration, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                      (self.run_id(), test_id, outcome, duration, datetime.now().isoformat(timespec="seconds")))
+        self._stats = None
+
+    def record_step(self, test_id, step, outcome, duration):
+        self._execute("INSERT INTO step_results (run_id, test_id, step, outcome, duration, recorded_at) "
+                      "VALUES (?, ?, ?, ?, ?, ?)",
+                      (self.run_id(), test_id, step, outcome, duration, datetime.now().isoformat(timespec="seconds")))
+
+    def stats(self):
+        """Returns TestStats per test id, computed from the last `window` runs that were not skipped"""
+        if self._stats is None:
+            rows = self._execute("SELECT test_id, outcome, duration FROM test_results WHERE outcome != ? "
+                                 "ORDER BY test_id, id DESC", (SKIP,)).fetchall()
+            results = {}
+            for test_id, outcome, duration in rows:
+                recent = results.setdefault(test_id, [])
+                if len(recent) < self.window:
+                    recent.append((outcome != PASS, duration))
+            self._stats = {test_id: self._summarize(test_id, recent) for test_id, recent in results.items()}
+        return self._stats
+
+    @staticmethod
+    def _summarize(test_id, recent):
+        """`recent` is a list of (failed, duration), newest first"""
+        failed = [result[0] for result in recent]
+        weights = [_FAILURE_SCORE_DECAY ** age for age in range(len(recent))]
+        failure_score = sum(weight for weight, fail in zip(weights, failed) if fail) / sum(weights)
+        flips = sum(1 for newer, older in zip(failed, failed[1:]) if newer != older)
+        flip_rate = flips / (len(recent) - 1) if len(recent) > 1 else 0.0
+        # Failing runs often stop early, estimate the duration from passing runs when there are any
+        passing = [duration for fail, duration in recent if not fail]
+        duration = statistics.median(passing or [duration for _, duration in recent])
+        flaky = len(recent) >= Config.FLAKY_MIN_RUNS and flip_rate >= Config.FLAKY_FLIP_RATE
+        return TestStats(test_id, len(recent), sum(failed), failure_score, flip_rate, duration, flaky)
+
+    def durations(self):
+        """Estimated duration in seconds of each test with history"""
+        return {test_id: stats.duration for test_id, stats in self.stats().items()}
+
+    def quarantined(self):
+        """Ids of the tests whose outcome keeps flipping between runs"""
+        return {test_id for test_id, stats in self.stats().items() if stats.flaky}
+
+    def order(self, test_ids):
+        """Orders tests for the quickest feedback: likely to fail first, then fastest first"""
+        stats = self.stats()
+        known = [s.duration for s in stats.values()]
+        default_duration = statistics.mean(known) if known else 0.0
+
+        def priority(test_id):
+            if test_id not in stats:
+                return -_UNKNOWN_FAILURE_SCORE, default_duration
+            return -stats[test_id].failure_score, stats[test_id].duration
+        return sorted(test_ids, key=priority)
+
+    def step_durations(self, test_id):
+        """Median duration and failure count of every step of a test over the recent runs"""
+        rows = self._execute("SELECT step, outcome, duration FROM step_results WHERE test_id = ? "
+                             "ORDER BY id DESC LIMIT ?", (test_id, self.window * 20)).fetchall()
+        steps = {}
+        for step, outcome, duration in rows:
+            steps.setdefault(step, []).append((outcome != PASS, duration))
+        return {step: (statistics.median(duration for _, duration in results), sum(fail for fail, _ in results))
+                for step, results in steps.items()}
+
+
+def quarantine(test, reason="Quarantined as flaky (use --run-quarantined to count it)"):
+    """Keeps a test instance out of the result: it still runs, but reports as skipped.
+
+    The outcome it really had is kept in `test.quarantined_outcome` and recorded in the history, so a test that
+    stops flipping leaves quarantine once its recent runs are stable"""
+    method = getattr(test, test._testMethodName)
+
+    @functools.wraps(method)
+    def run_quarantined(*args, **kwargs):
+        try:
+            method(*args, **kwargs)
+            test.quarantined_outcome = PASS
+        except unittest.SkipTest:
+            raise
+        except test.failureException:
+            test.quarantined_outcome = FAIL
+        except Exception:
+            test.quarantined_outcome = ERROR
+        raise unittest.SkipTest(f"{reason}, {test.quarantined_outcome}")
+
+    setattr(test, test._testMethodName, run_quarantined)
+    return test
+
+
+_history = None
+
+
+def get_test_history():
+    """Returns the process-wide history store"""
+    global _history
+    if _history is None:
+        _history = TestHistory()
+    return _history
+
+
+def main():
+    history = get_test_history()
+    print(f"{'Test':<70} {'Runs':>5} {'Fails':>6} {'Score':>6} {'Flips':>6} {'Median s':>9}  Flaky")
+    for stats in sorted(history.stats().values(), key=lambda s: -s.failure_score):
+        print(f"{stats.test_id[-70:]:<70} {stats.runs:>5} {stats.failures:>6} {stats.failure_score:>6.2f} "
+              f"{stats.flip_rate:>6.2f} {stats.duration:>9.2f}  {'yes' if stats.flaky else ''}")
+        for step, (duration, failures) in history.step_durations(stats.test_id).items():
+            print(f"    {step[:66]:<66} {'':>5} {failures:>6} {'':>6} {'':>6} {duration:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
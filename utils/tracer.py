@@ -0,0 +1,191 @@
+"""WebDriver command and page object method timing.
+
+Every WebDriver command and every public page object method call is recorded as a span tagged with the running
+test and step. After a run the spans are written next to the HTML report as a Chrome trace (open it in
+chrome://tracing or https://ui.perfetto.dev) and as a per-step summary table.
+"""
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from config.config import Config
+from utils.logger_config import logger
+
+# WebDriver commands grouped into the columns of the step summary; everything else counts as "other"
+COMMAND_CATEGORIES = {
+    "navigation": {"get", "goBack", "goForward", "refresh", "newWindow", "switchToWindow", "close"},
+    "locate": {"findElement", "findElements", "findChildElement", "findChildElements"},
+    "interaction": {"clickElement", "sendKeysToElement", "clearElement", "actions"},
+    "script": {"w3cExecuteScript", "w3cExecuteScriptAsync", "executeAsyncScript"},
+}
+SUMMARY_CATEGORIES = ["navigation", "locate", "interaction", "script", "other", "wait"]
+
+_command_categories = {command: category for category, commands in COMMAND_CATEGORIES.items()
+                       for command in commands}
+
+
+class Tracer:
+    """Collects timed spans in the Chrome trace event format ("X" complete events, times in microseconds)"""
+    def __init__(self):
+        self.events = []
+        self.test = None
+        self.step = None
+        self._test_start = None
+        self._step_start = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def now():
+        """Returns (wall clock timestamp in us, monotonic start) for a span starting now"""
+        return time.time_ns() // 1000, time.perf_counter()
+
+    def record(self, name, category, start, **args):
+        timestamp, started = start
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": timestamp,
+            "dur": (time.perf_counter() - started) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {"test": self.test, "step": self.step, **args},
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def set_process_name(self, name):
+        """Labels this process's track in the trace viewer (e.g. 'worker 1')"""
+        with self._lock:
+            self.events.append({"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": name}})
+
+    def start_test(self, test_id):
+        self.end_test()
+        self.test = test_id
+        self._test_start = self.now()
+
+    def start_step(self, name):
+        """Ends the current step and tags every following span with the new one"""
+        self._end_step()
+        self.step = name
+        self._step_start = self.now()
+
+    def end_test(self):
+        self._end_step()
+        if self.test is not None:
+            self.record(self.test, "test", self._test_start)
+        self.test = None
+
+    def _end_step(self):
+        if self.step is not None:
+            self.record(self.step, "step", self._step_start)
+        self.step = None
+
+    def trace_method(self, name, method):
+        """Wraps a page object method so each call is recorded. Only the outermost wait_* call of a nested
+        chain is recorded as "wait", so the summary does not count the same waiting time twice."""
+        is_wait = name.startswith("wait")
+
+        @functools.wraps(method)
+        def traced(page, *args, **kwargs):
+            outer_wait = is_wait and not getattr(self._local, "in_wait", False)
+            if outer_wait:
+                self._local.in_wait = True
+            start = self.now()
+            try:
+                return method(page, *args, **kwargs)
+            finally:
+                if outer_wait:
+                    self._local.in_wait = False
+                self.record(f"{type(page).__name__}.{name}", "wait" if outer_wait else "page", start)
+        return traced
+
+    def step_summary(self):
+        """Returns one row per (test, step): duration, command count and seconds spent per category"""
+        rows = {}
+        for event in self.events:
+            if event["ph"] != "X" or event["cat"] == "test" or event["args"].get("test") is None:
+                continue
+            key = (event["args"]["test"], event["args"]["step"])
+            row = rows.setdefault(key, {"test": key[0], "step": key[1] or "(no step)", "duration": 0.0,
+                                        "commands": 0, **{category: 0.0 for category in SUMMARY_CATEGORIES}})
+            seconds = event["dur"] / 1e6
+            if event["cat"] == "step":
+                row["duration"] = seconds
+            elif event["cat"] in SUMMARY_CATEGORIES:
+                row[event["cat"]] += seconds
+                row["commands"] += event["cat"] != "wait"
+        return list(rows.values())
+
+    def export(self, report_dir=Config.HTML_REPORT_PATH, timestamp=None):
+        """Writes the Chrome trace JSON and the per-step summary table; returns both paths"""
+        timestamp = timestamp or datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        os.makedirs(report_dir, exist_ok=True)
+        trace_path = os.path.join(report_dir, f"InsiderTrace_{timestamp}.json")
+        summary_path = os.path.join(report_dir, f"InsiderStepSummary_{timestamp}.txt")
+
+        with open(trace_path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(format_step_summary(self.step_summary()))
+        logger.info("Trace written to %s, step summary to %s", trace_path, summary_path)
+        return trace_path, summary_path
+
+
+def command_category(command):
+    return _command_categories.get(command, "other")
+
+
+def format_step_summary(rows):
+    header = f"{'Test / step':<70} {'Total s':>8} {'Cmds':>5}" + "".join(
+        f" {category.capitalize():>11}" for category in SUMMARY_CATEGORIES)
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        label = f"{row['test'].rsplit('.', 1)[-1]} / {row['step']}"
+        lines.append(f"{label[:70]:<70} {row['duration']:>8.2f} {row['commands']:>5}" + "".join(
+            f" {row[category]:>11.2f}" for category in SUMMARY_CATEGORIES))
+    return "\n".join(lines) + "\n"
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    """Returns the process-wide tracer"""
+    return _tracer
+
+
+def instrument_driver(driver, tracer=None):
+    """Times every WebDriver command sent through the driver, including WebElement commands.
+
+    All commands pass through `driver.execute`, so it is wrapped on the instance. Pooled drivers are reused
+    across tests and are only wrapped once."""
+    if getattr(driver, "_insider_traced", False):
+        return driver
+    tracer = tracer or get_tracer()
+    execute = driver.execute
+
+    def traced_execute(driver_command, params=None):
+        start = tracer.now()
+        try:
+            return execute(driver_command, params)
+        finally:
+            tracer.record(driver_command, command_category(driver_command), start)
+
+    driver.execute = traced_execute
+    driver._insider_traced = True
+    return driver
+
+
+def trace_methods(cls, tracer=None):
+    """Wraps the public methods defined on a page object class so every call is recorded"""
+    tracer = tracer or get_tracer()
+    for name, value in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.isfunction(value):
+            setattr(cls, name, tracer.trace_method(name, value))
+    return cls